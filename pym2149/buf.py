@@ -17,6 +17,7 @@
 
 from .const import u4
 from .shapes import floatdtype, signaldtype
+from collections import OrderedDict
 from diapyr.util import enum
 from pyrbo import generic, LOCAL, turbo, T
 import numpy as np
@@ -91,15 +92,6 @@ class Buf(metaclass = generic):
         for i in range(py_self_buf.size):
             self_buf[i] = value
 
-    @_turbo(start = u4, end = u4, step = u4, data = [T], j = u4)
-    def putstrided(self, start, end, step, data):
-        self_buf = LOCAL
-        j = 0
-        while start < end:
-            self_buf[start] = data[j]
-            start += step
-            j += 1
-
     def ceildiv(self, divisor, alreadynegated = False):
         if not alreadynegated:
             self.buf *= -1
@@ -115,6 +107,12 @@ class Buf(metaclass = generic):
         for i in range(py_that_buf.size):
             self_buf[i] = lookup[that_buf[i]]
 
+    @_turbo(signal = dict(buf = [signaldtype]), index = dict(buf = [signaldtype]), table = [T], width = u4, i = u4)
+    def sublookup(self, signal, index, table, width):
+        self_buf = signal_buf = index_buf = py_signal_buf = LOCAL
+        for i in range(py_signal_buf.size):
+            self_buf[i] -= table[signal_buf[i] * width + index_buf[i]]
+
     def add(self, value):
         self.buf += value
 
@@ -139,24 +137,95 @@ class Buf(metaclass = generic):
         self.buf[0] -= lastofprev
         self.buf[1:] -= that.buf[:-1]
 
+    def steps(self, lastofprev):
+        diff = np.empty_like(self.buf)
+        np.subtract(self.buf[:1], lastofprev, out = diff[:1])
+        np.subtract(self.buf[1:], self.buf[:-1], out = diff[1:])
+        frames = np.flatnonzero(diff)
+        return frames, diff[frames]
+
+    def tolist(self): # For tests.
+        return list(self.buf)
+
+class Const:
+    'Stands in for a Buf whose values are all the same, so consumers can do scalar arithmetic instead.'
+
+    def __init__(self, value, framecount):
+        self.value = value
+        self.framecount = framecount
+
+    def __len__(self):
+        return self.framecount
+
+    def last(self):
+        return self.value
+
+    @property
+    def buf(self):
+        return np.full(self.framecount, self.value)
+
+    def steps(self, lastofprev):
+        amp = self.value - lastofprev
+        n = 1 if self.framecount and amp else 0
+        return np.zeros(n, np.intp), np.full(n, amp)
+
+    def tolist(self): # For tests.
+        return list(self.buf)
+
+class Lookup:
+    'Stands in for a Buf whose values are table[32 * signal + index] so that successive maps compose on the table and run in one pass.'
+
+    width = 32
+
+    def __init__(self, signal, index, table):
+        self.signal = signal
+        self.index = index
+        self.table = table
+
+    def __len__(self):
+        return len(self.signal)
+
+    def last(self):
+        return self.table[self.width * self.signal.last() + self.index.last()]
+
+    @property
+    def buf(self):
+        return self.table[self.width * self.signal.buf + self.index.buf]
+
+    def map(self, lookup):
+        return type(self)(self.signal, self.index, lookup[self.table])
+
     def tolist(self): # For tests.
         return list(self.buf)
 
 class MasterBuf:
 
+    viewcachesize = 8 # Enough for the few block sizes a timer alternates between.
+
     def __init__(self, dtype):
         self.bufcls = Buf[T, dtype]
         self.dtype = dtype
+        self.hits = self.misses = 0
         self.setsize(0)
 
     def setsize(self, size):
         self.buf = np.empty(size, self.dtype)
         self.bufobj = self.bufcls(self.buf)
         self.size = size
+        self.views = OrderedDict()
 
     def ensureandcrop(self, framecount):
         if self.size > framecount:
-            return self.bufcls(self.buf[:framecount])
+            view = self.views.get(framecount)
+            if view is None:
+                self.misses += 1
+                view = self.views[framecount] = self.bufcls(self.buf[:framecount])
+                if len(self.views) > self.viewcachesize:
+                    self.views.popitem(False)
+            else:
+                self.hits += 1
+                self.views.move_to_end(framecount)
+            return view
         if self.size < framecount:
             # Ideally we would resize in-place, but that can fall foul of numpy reference counting:
             self.setsize(framecount)
@@ -15,12 +15,16 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
-from .buf import BufType
+from .buf import BufType, Const, Lookup
 from .nod import BufNode
 from .shapes import level4to5, level5toamp, level4tosinus5shape, level4totone5shape
 from diapyr.util import singleton
 import numpy as np
 
+# Level5 tables for a Lookup with binary signal, the first has the envelope as index and the rest ignore the index:
+envlevel5table = np.concatenate([np.zeros(Lookup.width, BufType.signal.dtype), np.arange(Lookup.width, dtype = BufType.signal.dtype)])
+fixedlevel5tables = [np.repeat(np.array([0, level5], BufType.signal.dtype), Lookup.width) for level5 in range(32)]
+
 class Level(BufNode):
 
     def __init__(self, levelmodereg, fixedreg, env, signal, rtone, timereffectreg):
@@ -33,19 +37,30 @@ class Level(BufNode):
         self.timereffectreg = timereffectreg
 
     def callimpl(self):
-        self.timereffectreg.value.putlevel5(self)
+        return self.timereffectreg.value.putlevel5(self)
 
 @singleton
 class NullEffect:
     'All registers are non-virtual and write directly to chip, the timer does not interfere.'
 
+    def __reduce__(self):
+        return 'NullEffect' # Singleton.
+
     def putlevel5(self, node):
-        node.blockbuf.copybuf(node.chain(node.signal))
+        signal = node.chain(node.signal)
         if node.levelmodereg.value:
-            node.blockbuf.mulbuf(node.chain(node.env))
+            env = node.chain(node.env)
+            if not isinstance(env, Const):
+                if isinstance(signal, Const):
+                    return env if signal.value else signal # Binary signal, so no product needed.
+                return Lookup(signal, env, envlevel5table) # Defer the product so Dac and mixer can fuse it.
+            level5 = env.value # Envelope is holding.
         else:
             # According to block diagram, the level is already 5-bit when combining with binary signal:
-            node.blockbuf.mul(level4to5(node.fixedreg.value))
+            level5 = level4to5(node.fixedreg.value)
+        if isinstance(signal, Const):
+            return Const(signal.value * level5, len(signal))
+        return Lookup(signal, signal, fixedlevel5tables[level5])
 
 class FixedLevelEffect:
     'Registers levelmodereg and fixedreg are virtual, of which levelmodereg is ignored.'
@@ -53,6 +68,9 @@ class FixedLevelEffect:
     def __init__(self):
         self.wavelength, = {shape.wavelength() for shape in self.level4toshape}
 
+    def __reduce__(self):
+        return type(self).__name__ # Subclasses are singletons.
+
     def getshape(self, fixedreg):
         return self.level4toshape[fixedreg.value]
 
@@ -96,4 +114,9 @@ class Dac(BufNode):
         self.level = level
 
     def callimpl(self):
-        self.blockbuf.mapbuf(self.chain(self.level), self.leveltopeaktopeak)
+        level = self.chain(self.level)
+        if isinstance(level, Const):
+            return Const(self.leveltopeaktopeak[level.value], len(level))
+        if isinstance(level, Lookup):
+            return level.map(self.leveltopeaktopeak)
+        self.blockbuf.mapbuf(level, self.leveltopeaktopeak)
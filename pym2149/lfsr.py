@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
+import numpy as np
+
 class Lfsr:
 
     def __init__(self, nzdegrees):
@@ -34,3 +36,24 @@ class Lfsr:
             yield self()
             if first == self.x:
                 break
+
+def fullperiod(nzdegrees):
+    'Same as the values of a whole Lfsr iteration but computed in bulk, assuming the polynomial gives maximal length.'
+    degree = max(nzdegrees)
+    size = (1 << degree) - 1
+    lfsr = Lfsr(nzdegrees)
+    bits = np.empty(size, np.uint8)
+    bits[:degree] = [1 - lfsr() for _ in range(degree)]
+    # The raw bits obey bits[n] = XOR of bits[n - d] over nzdegrees, and squaring the polynomial shows it also holds with every d doubled:
+    n = degree
+    while n < size:
+        scale = 1
+        while degree * scale * 2 <= n:
+            scale *= 2
+        end = min(size, n + min(nzdegrees) * scale)
+        chunk = np.zeros(end - n, np.uint8)
+        for d in nzdegrees:
+            chunk ^= bits[n - d * scale:end - d * scale]
+        bits[n:end] = chunk
+        n = end
+    return 1 - bits
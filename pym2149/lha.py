@@ -19,24 +19,38 @@ octet = 8
 
 class Stream:
 
-    masks = [(1 << m) - 1 for m in range(octet + 1)] # Element 0 unused.
-    remaining = octet
+    peekmax = 2 * octet + 1 # Max bits a 3-byte window can serve at any alignment.
+    masks = [(1 << m) - 1 for m in range(peekmax + 1)]
+    pad = bytes(3)
 
     def __init__(self, data, cursor = 0, step = 1):
-        self.data = data
-        self.cursor = cursor
+        self.data = bytes(data[cursor::step]) + self.pad
+        self.start = cursor
         self.step = step
+        self.pos = 0 # Bits consumed.
+
+    @property
+    def cursor(self):
+        return self.start + self.step * (self.pos >> 3)
+
+    @property
+    def remaining(self):
+        return octet - (self.pos & 7)
+
+    def peek(self, n):
+        pos = self.pos
+        i = pos >> 3
+        data = self.data
+        return (data[i] << 16 | data[i + 1] << 8 | data[i + 2]) >> 3 * octet - (pos & 7) - n & self.masks[n]
 
     def read(self, n):
-        x = 0
-        while n:
-            m = min(n, self.remaining)
-            n -= m
-            self.remaining -= m
-            x = x << m | self.data[self.cursor] >> self.remaining & self.masks[m]
-            if not self.remaining:
-                self.cursor += self.step
-                self.remaining = octet
+        if n > self.peekmax:
+            x = self.read(n - self.peekmax) << self.peekmax
+            n = self.peekmax
+        else:
+            x = 0
+        x |= self.peek(n)
+        self.pos += n
         return x
 
     def readcodelen(self):
@@ -49,6 +63,8 @@ class Stream:
 class Tree:
 
     trivialkey = 1 # The empty code prefixed with a 1.
+    lenbits = 5
+    lenmask = (1 << lenbits) - 1
 
     @classmethod
     def canonical(cls, codelens):
@@ -68,12 +84,23 @@ class Tree:
 
     def __init__(self, lookup):
         self.lookup = lookup
+        # Index by the next width bits, entry is value and code length packed together:
+        self.width = width = max(lookup).bit_length() - 1
+        self.mask = (1 << width) - 1
+        self.table = table = [None] * (1 << width)
+        for key, value in lookup.items():
+            l = key.bit_length() - 1
+            span = 1 << width - l
+            i = (key - (1 << l)) * span
+            table[i:i + span] = [value << self.lenbits | l] * span
 
     def readvalue(self, stream):
-        k = self.trivialkey
-        while k not in self.lookup:
-            k = k << 1 | stream.read(1)
-        return self.lookup[k]
+        pos = stream.pos
+        i = pos >> 3
+        data = stream.data # Inlined peek as this is the hot path.
+        entry = self.table[(data[i] << 16 | data[i + 1] << 8 | data[i + 2]) >> 3 * octet - (pos & 7) - self.width & self.mask]
+        stream.pos = pos + (entry & self.lenmask)
+        return entry >> self.lenbits
 
 class UnsupportedFormatException(Exception): pass
 
@@ -119,13 +146,6 @@ class Main(Tree):
             lens.extend(interpreter.mainlens(stream))
         return cls.canonical(lens)
 
-    def invoke(self, pair, offset):
-        x = self.readvalue(pair.stream)
-        if x < 256:
-            yield x
-        else:
-            yield from offset.copy(pair, x - 253)
-
 class Offset(Tree):
 
     @classmethod
@@ -136,29 +156,41 @@ class Offset(Tree):
         return cls.canonical(stream.readcodelen() for _ in range(size))
 
     def copy(self, pair, n):
-        off = len(pair.buffer) - 1
+        buffer = pair.buffer
+        off = len(buffer) - 1
         x = self.readvalue(pair.stream)
         if x < 2:
             off -= x
         else:
             x -= 1
             off -= (1 << x) | pair.stream.read(x)
-        for i in range(off, off + n):
-            yield pair.buffer[i]
+        end = off + n
+        if end <= len(buffer):
+            buffer += buffer[off:end]
+        else: # The match overlaps its own output, so repeat the available period.
+            period = buffer[off:]
+            q, r = divmod(n, len(period))
+            buffer += period * q + period[:r]
 
 class Pair:
 
     def __init__(self, stream):
-        self.buffer = []
+        self.buffer = bytearray()
         self.stream = stream
 
     def pipe(self, targetlen):
-        while len(self.buffer) != targetlen:
-            commands = self.stream.read(16)
-            main = Main.readtree(self.stream)
-            offset = Offset.readtree(self.stream)
+        buffer = self.buffer
+        stream = self.stream
+        while len(buffer) != targetlen:
+            commands = stream.read(16)
+            main = Main.readtree(stream)
+            offset = Offset.readtree(stream)
             for _ in range(commands):
-                self.buffer.extend(main.invoke(self, offset))
+                x = main.readvalue(stream)
+                if x < 256:
+                    buffer.append(x)
+                else:
+                    offset.copy(self, x - 253)
 
 def unlha(u):
     if b'-lh5-' != u[2:7] or u[20]:
@@ -26,7 +26,7 @@ from diapyr.util import innerclass
 from lurlene import topitch
 from lurlene.bridge import LiveCodingBridge
 from lurlene.context import Context
-import logging
+import logging, re
 
 log = logging.getLogger(__name__)
 
@@ -137,6 +137,10 @@ class YM2149Chip(Chip):
 
 class LurleneBridge(LiveCodingBridge, Prerecorded): pass
 
+def issong(path):
+    'Whether the given Python file looks like a Lurlene song, which always imports from lurlene.'
+    return re.search(r'^\s*(?:from|import)\s+lurlene\b', path.read_text(errors = 'replace'), re.MULTILINE) is not None
+
 @types(Config, Context, this = Started)
 def loadcontext(config, context):
     with open(config.inpath) as f:
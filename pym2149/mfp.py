@@ -40,6 +40,16 @@ class MFPTimer:
         self.prescalerornone = Reg().link(lambda tcr: prescalers.get(tcr), self.control)
         self.repeat = Reg().link(lambda _: None, self.effect)
 
+    def _regs(self):
+        return self.control, self.data, self.effectivedata, self.effect, self.control_data, self.freq, self.prescalerornone, self.repeat
+
+    def snapshot(self):
+        return tuple(r.snapshot() for r in self._regs())
+
+    def restore(self, snapshot):
+        for r, s in zip(self._regs(), snapshot):
+            r.restore(s)
+
     def update(self, tcr, tdr, effect):
         self.control_data.value = tcr, tdr
         self.effect.value = effect
@@ -16,10 +16,75 @@
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
 from .clock import ClockInfo
+from .const import i4, i8, u4
 from .iface import Platform
+from .shapes import floatdtype
 from diapyr import types
 from minBlepy.minblep import MinBleps
+from pyrbo import turbo
 
 @types(Platform, ClockInfo, this = MinBleps)
 def loadorcreate(platform, clockinfo):
     return MinBleps.loadorcreate(clockinfo.implclock, platform.outputrate, None)
+
+def pastesteps(minbleps, naivex, frames, amps, outbuf):
+    'Like MinBleps.paste but only visits the given steps, so cost is proportional to the number of transitions.'
+    _pastesteps(outbuf.buf, len(outbuf), minbleps.naivex2outx, minbleps.naivex2off, minbleps.demultiplexed, minbleps.mixinsize, minbleps.naiverate, minbleps.outrate, naivex, frames.astype(i8, copy = False), amps, len(frames))
+
+@turbo(
+    outbuf = [floatdtype],
+    outsize = u4,
+    naivex2outx = [i4],
+    naivex2off = [i4],
+    demultiplexed = [floatdtype],
+    mixinsize = u4,
+    naiverate = u4,
+    outrate = u4,
+    naivex = u4,
+    frames = [i8],
+    amps = [floatdtype],
+    stepcount = u4,
+    out0 = i8,
+    wrapped = i8,
+    x = i8,
+    i = i8,
+    off = i8,
+    dcindex = i8,
+    dclevel = floatdtype,
+    a = floatdtype,
+    j = u4,
+    k = u4,
+)
+def _pastesteps(outbuf, outsize, naivex2outx, naivex2off, demultiplexed, mixinsize, naiverate, outrate, naivex, frames, amps, stepcount):
+    # Same arithmetic as the dense paste so that output is bit-identical:
+    out0 = naivex2outx[naivex]
+    wrapped = 0
+    dclevel = 0
+    dcindex = 0
+    for k in range(stepcount):
+        a = amps[k]
+        if a:
+            x = naivex + frames[k] - wrapped
+            while x >= naiverate:
+                x -= naiverate
+                wrapped += naiverate
+                out0 -= outrate
+            i = naivex2outx[x] - out0
+            off = naivex2off[x]
+            if dcindex <= i: # We can DC-adjust while pasting this mixin.
+                while dcindex < i:
+                    outbuf[dcindex] += dclevel
+                    dcindex += 1
+                for j in range(mixinsize):
+                    outbuf[i + j] += demultiplexed[off + j] * a + dclevel
+            else: # The mixin starts before the pending DC adjustment.
+                while dcindex < i + mixinsize:
+                    outbuf[dcindex] += dclevel
+                    dcindex += 1
+                for j in range(mixinsize):
+                    outbuf[i + j] += demultiplexed[off + j] * a
+            dcindex = i + mixinsize
+            dclevel += a
+    while dcindex < outsize:
+        outbuf[dcindex] += dclevel
+        dcindex += 1
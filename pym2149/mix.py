@@ -15,7 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
-from .buf import BufType
+from .buf import BufType, Const, Lookup
 from .nod import BufNode, Node
 import logging
 
@@ -38,14 +38,30 @@ class BinMix(BufNode):
         # We use AND as zero is preferred over envelope, see qbmixenv:
         noiseflag = self.noiseflagreg.value
         if self.toneflagreg.value:
-            self.blockbuf.copybuf(self.chain(self.tone))
+            source = self.chain(self.tone)
             if noiseflag:
-                self.blockbuf.andbuf(self.chain(self.noise))
+                source = self.andsources(source, self.chain(self.noise))
         elif noiseflag:
-            self.blockbuf.copybuf(self.chain(self.noise))
+            source = self.chain(self.noise)
         else:
             # Fixed and variable levels should work, see qanlgmix and qenvpbuf:
-            self.blockbuf.fill_i1(1)
+            return Const(BufType.signal.dtype(1), self.block.framecount)
+        if isinstance(source, Const):
+            return source
+        if source is not self.blockbuf:
+            self.blockbuf.copybuf(source)
+
+    def andsources(self, tone, noise):
+        if isinstance(noise, Const):
+            tone, noise = noise, tone
+        if isinstance(tone, Const):
+            if isinstance(noise, Const):
+                return Const(tone.value & noise.value, len(tone))
+            # Signals are binary so AND with 1 is the identity:
+            return noise if tone.value else tone
+        self.blockbuf.copybuf(tone)
+        self.blockbuf.andbuf(noise)
+        return self.blockbuf
 
 class Multiplexer(Node):
 
@@ -62,7 +78,9 @@ class Multiplexer(Node):
                 # BufNode can't do this because size is not framecount:
                 size = len(buf)
                 multi = self.multi.ensureandcrop(size * self.channels)
-            multi.putstrided(i, i + self.channels * size, self.channels, buf.buf)
+                # Interleaved means each frame is a row, so each stream is a column:
+                columns = multi.buf.reshape(size, self.channels)
+            columns[:, i] = buf.buf
         return multi
 
 class IdealMixer(BufNode):
@@ -83,15 +101,43 @@ class IdealMixer(BufNode):
         self.chipamps = chipamps
 
     def nontrivialcallimpl(self):
-        self.blockbuf.fill_same(self.datum)
+        return self.mix(self.contribs())
+
+    def contribs(self):
+        dtype = BufType.float.dtype
         contrib = self.contrib.ensureandcrop(self.block.framecount)
         for buf, amp in zip(self.chain(self.container), self.chain(self.chipamps)):
             if amp:
-                contrib.copybuf(buf)
-                contrib.mul(amp)
-                self.blockbuf.subbuf(contrib)
+                if isinstance(buf, Const):
+                    yield Const(dtype(dtype(buf.value) * amp), len(buf))
+                elif isinstance(buf, Lookup):
+                    yield Lookup(buf.signal, buf.index, (buf.table * amp).astype(dtype))
+                else:
+                    contrib.copybuf(buf)
+                    contrib.mul(amp)
+                    yield contrib
 
     def trivialcallimpl(self):
-        self.blockbuf.fill_same(self.datum)
-        for buf in self.chain(self.container):
-            self.blockbuf.subbuf(buf)
+        return self.mix(self.chain(self.container))
+
+    def mix(self, bufs):
+        # Subtract in the same order as a plain buffer pass so the float result is identical:
+        level = self.datum
+        filled = False
+        for buf in bufs:
+            if isinstance(buf, Const):
+                if filled:
+                    self.blockbuf.add(-buf.value)
+                else:
+                    level -= buf.value
+            else:
+                if not filled:
+                    self.blockbuf.fill_same(level)
+                    filled = True
+                if isinstance(buf, Lookup):
+                    # Level, Dac and this subtraction in one pass:
+                    self.blockbuf.sublookup(buf.signal, buf.index, buf.table, buf.width)
+                else:
+                    self.blockbuf.subbuf(buf)
+        if not filled:
+            return Const(level, self.block.framecount)
@@ -37,14 +37,17 @@ class Node:
         return self(block, False)
 
     def __call__(self, block, masked):
-        if self.block != block:
+        if self.block is not block:
             self.block = block
             self.masked = masked
-            self.result = self.callimpl()
+            self.result = self.makeresult()
         elif not masked and self.masked:
             log.warning("This node has already executed masked: %s", self)
         return self.result
 
+    def makeresult(self):
+        return self.callimpl()
+
     def chain(self, node):
         return node(self.block, self.masked)
 
@@ -55,7 +58,8 @@ class Container(Node):
         self.nodes = nodes
 
     def callimpl(self):
-        return [self.chain(node) for node in self.nodes]
+        block, masked = self.block, self.masked
+        return [node(block, masked) for node in self.nodes]
 
     def __len__(self):
         return len(self.nodes)
@@ -66,12 +70,9 @@ class BufNode(Node):
         super().__init__()
         self.masterbuf = buftype()
         self.channels = channels
-        self.realcallimpl = self.callimpl
-        self.callimpl = self.makeresult
 
     def makeresult(self):
         self.blockbuf = self.masterbuf.ensureandcrop(self.block.framecount * self.channels)
-        resultornone = self.realcallimpl()
-        if resultornone is not None:
-            return resultornone
-        return self.blockbuf
+        # A node whose block turns out to be constant may return a Const instead of writing blockbuf:
+        resultornone = self.callimpl()
+        return self.blockbuf if resultornone is None else resultornone
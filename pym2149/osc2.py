@@ -15,10 +15,11 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
-from .buf import BufType
+from .buf import BufType, Const
 from .const import i4, i8, u1, u4, u8
 from .nod import BufNode
 from .shapes import Shape, signaldtype, toneshape
+from .util import ceildiv
 from pyrbo import LOCAL, turbo
 import itertools, numpy as np
 
@@ -33,19 +34,66 @@ class ShapeOsc(BufNode):
 
     progressdtype = u4
 
-    def __init__(self, scale, periodreg):
+    def __init__(self, scale, periodreg, numpyosc = False):
         super().__init__(BufType.signal)
         self.stepsize = 0 # XXX: Move to reset?
         self.scale = scale
         self.periodreg = periodreg
+        if numpyosc:
+            self.shapeimpl = self.shapenumpy
 
     def reset(self, shape):
         self.index = -1
         self.progress = np.iinfo(self.progressdtype).max
         self.shape = shape
 
+    def snapshot(self):
+        'Excludes the shape, which is fixed unless a subclass says otherwise.'
+        return self.index, self.progress, self.stepsize
+
+    def restore(self, snapshot):
+        self.index, self.progress, self.stepsize = snapshot
+
     def callimpl(self):
-        self.index, self.progress, self.stepsize = self.shapeimpl()
+        if self.masked:
+            # Nobody reads the output, so just keep the phase:
+            self.advance(self.block.framecount)
+        else:
+            self.index, self.progress, self.stepsize = self.shapeimpl()
+
+    def _steps(self, framecount):
+        'Return frames left of the current step, the new stepsize and how many steps start in a block of the given size.'
+        stepsize = self.periodreg.value * self.scale if self.eager else self.stepsize
+        i = min(stepsize - self.progress, framecount) if self.progress < stepsize else 0
+        if i == framecount:
+            return i, stepsize, 0
+        if not self.eager:
+            stepsize = self.periodreg.value * self.scale
+        return i, stepsize, ceildiv(framecount - i, stepsize)
+
+    def advance(self, framecount):
+        'Update state exactly as if a block of the given size had been rendered.'
+        i, self.stepsize, n = self._steps(framecount)
+        if n:
+            self.index = self.shape.advanceindex(self.index, n)
+            self.progress = framecount - i - (n - 1) * self.stepsize
+        else:
+            self.progress += framecount
+
+    def shapenumpy(self):
+        'Same as shapeimpl but vectorised, for when compiling the kernel is not an option.'
+        framecount = self.block.framecount
+        buf = self.blockbuf.buf
+        shape = self.shape
+        i, stepsize, n = self._steps(framecount)
+        buf[:i] = shape.buf[self.index]
+        if not n:
+            return self.index, self.progress + framecount, stepsize
+        indices = np.arange(self.index + 1, self.index + 1 + n)
+        wrapped = indices >= shape.size
+        indices[wrapped] = shape.introlen + (indices[wrapped] - shape.introlen) % shape.wavelength()
+        buf[i:] = np.repeat(shape.buf[indices], stepsize)[:framecount - i]
+        return int(indices[-1]), framecount - i - (n - 1) * stepsize, stepsize
 
     @turbo(
         self = dict(
@@ -131,6 +179,16 @@ class RToneOsc(BufNode):
             self.repeat, self.index, self.maincounter, self.precounterxmfp = self.rtoneimpl(prescalerornone, self.timer.effectivedata.value)
         self.timer.repeat.value = self.repeat
 
+    def snapshot(self):
+        if self.effect is None:
+            return None,
+        return self.effect, self.maincounter, self.precounterxmfp, self.repeat, self.index
+
+    def restore(self, snapshot):
+        self.effect, *counters = snapshot
+        if counters:
+            self.maincounter, self.precounterxmfp, self.repeat, self.index = counters
+
     @turbo(
         self = dict(
             oscnodepyrbotype,
@@ -183,18 +241,18 @@ class ToneOsc(ShapeOsc):
 
     eager = True
 
-    def __init__(self, scale, periodreg):
+    def __init__(self, scale, periodreg, numpyosc = False):
         scaleofstep = scale * 2 // 2 # Normally half of 16.
-        super().__init__(scaleofstep, periodreg)
+        super().__init__(scaleofstep, periodreg, numpyosc)
         self.reset(toneshape)
 
 class NoiseOsc(ShapeOsc):
 
     eager = False
 
-    def __init__(self, scale, periodreg, shape):
+    def __init__(self, scale, periodreg, shape, numpyosc = False):
         scaleofstep = scale * 2 # This results in authentic spectrum, see qnoispec.
-        super().__init__(scaleofstep, periodreg)
+        super().__init__(scaleofstep, periodreg, numpyosc)
         self.reset(shape)
 
 class EnvOsc(ShapeOsc):
@@ -215,14 +273,45 @@ class EnvOsc(ShapeOsc):
         shapes[s] = shapes[0x0f if s & 0x04 else 0x09]
     del s
 
-    def __init__(self, scale, periodreg, shapereg):
+    def __init__(self, scale, periodreg, shapereg, numpyosc = False):
         scaleofstep = scale * 32 // self.steps
-        super().__init__(scaleofstep, periodreg)
+        super().__init__(scaleofstep, periodreg, numpyosc)
+        self.resetshape(0) # Replaced before use as shapeversion won't match, but means snapshot always works.
         self.shapeversion = None
         self.shapereg = shapereg
 
     def callimpl(self):
+        self.updateshape()
+        if self.shape.holdvalue is not None and self.index >= self.shape.introlen:
+            self.advance(self.block.framecount)
+            return Const(self.shape.holdvalue, self.block.framecount)
+        super().callimpl()
+
+    def updateshape(self):
         if self.shapeversion != self.shapereg.version:
-            self.reset(self.shapes[self.shapereg.value])
+            self.resetshape(self.shapereg.value)
             self.shapeversion = self.shapereg.version
-        super().callimpl()
+
+    def resetshape(self, shapekey):
+        self.reset(self.shapes[shapekey])
+        self.shapekey = shapekey
+
+    def advance(self, framecount):
+        self.updateshape()
+        super().advance(framecount)
+
+    def snapshot(self):
+        return super().snapshot(), self.shapekey, self.shapeversion
+
+    def restore(self, snapshot):
+        state, self.shapekey, self.shapeversion = snapshot
+        super().restore(state)
+        self.shape = self.shapes[self.shapekey]
+
+    def positionat(self, framecount):
+        'Return the index and progress the given number of frames after the shape was last written, assuming constant period.'
+        self.updateshape()
+        n = ceildiv(framecount, self.periodreg.value * self.scale)
+        if not n:
+            return -1, np.iinfo(self.progressdtype).max
+        return self.shape.advanceindex(-1, n), framecount - (n - 1) * self.periodreg.value * self.scale
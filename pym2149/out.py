@@ -18,7 +18,7 @@
 from .buf import BufType
 from .clock import ClockInfo
 from .iface import AmpScale, Config, Multiplexed, Platform, Stream
-from .minblep import MinBleps
+from .minblep import MinBleps, pastesteps
 from .mix import IdealMixer, Multiplexer
 from .nod import Node
 from .shapes import floatdtype
@@ -146,7 +146,6 @@ class WavBuf(Node):
 
     def __init__(self, clockinfo, naive, minbleps):
         super().__init__()
-        self.diffmaster = BufType.float()
         self.outmaster = BufType.float()
         # Need space for a whole mixin in case it is rooted at sample outcount:
         self.overflowsize = minbleps.mixinsize
@@ -160,8 +159,8 @@ class WavBuf(Node):
     def callimpl(self):
         # TODO: Unit-test that results do not depend on block size.
         naivebuf = self.chain(self.naive)
-        diffbuf = self.diffmaster.ensureandcrop(len(naivebuf))
-        diffbuf.differentiate(self.dc, naivebuf)
+        # Only the steps of the naive signal contribute a minBLEP, typically a tiny fraction of the block:
+        frames, amps = naivebuf.steps(self.dc)
         naivex, outcount = self.translator.step(self.block.framecount)
         # Make space for all samples we can output plus overflow:
         outsize = outcount + self.overflowsize
@@ -169,11 +168,19 @@ class WavBuf(Node):
         # Paste in the carry followed by the carried dc level:
         outbuf.copyasprefix(self.overflowsize, self.carrybuf)
         outbuf.fillpart(self.overflowsize, outsize, self.dc)
-        self.minbleps.paste(naivex, diffbuf, outbuf)
+        if frames.size: # Always empty for a constant block at the previous level.
+            pastesteps(self.minbleps, naivex, frames, amps, outbuf)
         self.carrybuf.copywindow(outbuf, outcount, outsize)
         self.dc = naivebuf.last()
         return self.outmaster.ensureandcrop(outcount)
 
+    def snapshot(self):
+        return self.carrybuf.buf.copy(), self.dc, self.translator.naivex
+
+    def restore(self, snapshot):
+        carry, self.dc, self.translator.naivex = snapshot
+        self.carrybuf.buf[:] = carry
+
 class WavPlatform(Platform):
 
     @types(Config)
@@ -0,0 +1,125 @@
+# Copyright 2014, 2018, 2019, 2020 Andrzej Cichocki
+
+# This file is part of pym2149.
+#
+# pym2149 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pym2149 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from .buf import Buf
+from .iface import Config, Roll, Stream, Timer
+from .out import FloatStream
+from .ym2149 import LogicalRegisters, PhysicalRegisters, YM2149
+from .ymplayer import Bundle, Player, Recorder, samewavs
+from diapyr import types
+import logging, multiprocessing, numpy as np
+
+log = logging.getLogger(__name__)
+_player = None # Set in each worker.
+
+def _initworker(player):
+    global _player
+    _player = player
+
+def _rendersegment(bounds):
+    return _player.rendersegment(*bounds)
+
+class ParallelPlayer(Player):
+    '''Render segments of the tune in worker processes, with output identical to Player, for a tune that ends.
+    A register-only pass records the registers of every frame and the chip state every checkpointinterval frames, then each worker renders its segment after a short warm-up from an arbitrary minBLEP carry.
+    Each segment is checked on arrival that its carry converged to where the previous one ended, and rendered again from there if not.
+    Workers are forked so that they inherit this player and its graph, which can't be pickled, so this needs a platform with fork.'''
+
+    warmupframes = 2 # Enough for the carry to depend only on the naive signal, given blocks not smaller than a minBLEP.
+    checkpointinterval = 50
+
+    @types(Config, Bundle, Roll, Timer, Stream, YM2149, PhysicalRegisters, LogicalRegisters, FloatStream)
+    def __init__(self, config, bundle, roll, timer, stream, chip, physical, logical, wavs):
+        super().__init__(config, bundle, roll, timer, stream)
+        if config.oscpause:
+            raise Exception('Parallel rendering needs oscpause false, as the register-only pass advances every oscillator.')
+        self.workers = config.renderworkers
+        self.chip = chip
+        self.physical = physical
+        self.logical = logical
+        self.wavs = wavs
+
+    def __call__(self):
+        self.initialwavs = [wav.snapshot() for wav in self.wavs]
+        self.frames = [] # Register state after the writes of each frame.
+        self.checkpoints = {} # Chip, timer and naive position at the start of a frame.
+        naivex = 0
+        for _ in self.bundle:
+            if self.quit:
+                break
+            self.roll.update()
+            if not len(self.frames) % self.checkpointinterval:
+                self.checkpoints[len(self.frames)] = self.chip.snapshot(), self.timer.snapshot(), naivex
+            self.frames.append((self.physical.snapshot(), self.logical.snapshot()))
+            for b in self.timer.blocksforperiod(self.updaterate):
+                self.chip.advance(b)
+                naivex = (naivex + b.framecount) % self.chip.clock
+        else:
+            segments = self._segments(len(self.frames))
+            log.debug("Rendering %s frames in %s segments.", len(self.frames), len(segments))
+            expected = self.initialwavs
+            with multiprocessing.get_context('fork').Pool(self.workers, _initworker, (self,)) as pool:
+                for (start, stop), (pcm, startwavs, endwavs) in zip(segments, pool.imap(_rendersegment, segments)):
+                    if self.quit:
+                        break
+                    if not samewavs(expected, startwavs):
+                        log.warning("Segment at frame %s did not converge, rendering it again.", start)
+                        pcm, _, endwavs = self.rendersegment(start, stop, expected)
+                    self.stream.f.block(Buf(pcm))
+                    expected = endwavs
+        self.stream.flush()
+
+    def _segments(self, n):
+        'Split the frames into about equal segments, each starting warmupframes after a checkpoint.'
+        starts = {0}
+        for k in range(1, self.workers):
+            checkpoint = max(0, round((n * k // self.workers - self.warmupframes) / self.checkpointinterval)) * self.checkpointinterval
+            starts.add(min(n, checkpoint + self.warmupframes))
+        bounds = sorted(starts | {n})
+        return list(zip(bounds, bounds[1:]))
+
+    def rendersegment(self, start, stop, wavsornone = None):
+        '''Return the samples for the given frames, and the state of the WavBufs at both ends.
+        If the WavBuf state at the start is given the result is exact, otherwise it is only as good as the warm-up.'''
+        first = max(0, start - self.warmupframes)
+        chipstate, timerstate, naivex = self.checkpoints[first]
+        self.chip.restore(chipstate)
+        self.timer.restore(timerstate)
+        for wav, (carry, dc, _) in zip(self.wavs, self.initialwavs):
+            wav.restore((carry, dc, naivex))
+        recorder = Recorder()
+        f, self.stream.f = self.stream.f, recorder
+        try:
+            for i in range(first, stop):
+                if i == start:
+                    if wavsornone is not None:
+                        for wav, s in zip(self.wavs, wavsornone):
+                            wav.restore(s)
+                    startwavs = [wav.snapshot() for wav in self.wavs]
+                    recorder.recording = True
+                physical, logical = self.frames[i]
+                self.physical.restore(physical)
+                self.logical.restore(logical)
+                for b in self.timer.blocksforperiod(self.updaterate):
+                    if i < start and wavsornone is not None:
+                        self.chip.advance(b) # No need to warm up.
+                    else:
+                        self.stream.call(b)
+        finally:
+            self.stream.f = f
+        return np.concatenate(recorder.blocks), startwavs, [wav.snapshot() for wav in self.wavs]
@@ -17,6 +17,8 @@
 
 class Link:
 
+    __slots__ = 'reg', 'xform', 'upstream'
+
     def __init__(self, reg, xform, upstream):
         self.reg = reg
         self.xform = xform
@@ -25,18 +27,51 @@ class Link:
     def update(self):
         if self.reg.idle:
             try:
-                upstreamvals = [r.value for r in self.upstream]
+                upstreamvals = [r._value for r in self.upstream]
             except AttributeError:
                 return
             self.reg.set(self.xform(*upstreamvals))
 
+class Batch:
+    'While active the given registers accept writes without propagating, on exit of the outermost use each affected link is updated once.'
+
+    def __init__(self, regs):
+        self.depth = 0
+        self.dirty = None
+        for r in regs:
+            r.batch = self
+
+    def __enter__(self):
+        if not self.depth:
+            self.dirty = {} # Insertion-ordered set.
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth:
+            return
+        dirty, self.dirty = self.dirty, None
+        for link in dict.fromkeys(link for r in dirty for link in r.links):
+            link.update()
+
+class Undefined:
+    'Snapshot of a register that has never been set, pickles by reference so identity survives a round trip.'
+
+    def __reduce__(self):
+        return 'undefined'
+
+undefined = Undefined()
+
 class Reg:
 
-    undefined = object()
+    __slots__ = 'links', 'idle', 'maxval', 'minval', '_value', 'batch'
+    undefined = undefined
 
     def __init__(self, value = undefined, *, maxval = None, minval = None):
         self.links = []
         self.idle = True
+        self.batch = None
         self.maxval = maxval # Friendlier than a mask.
         self.minval = minval # Typically to avoid 0 period.
         if value is not self.undefined:
@@ -53,28 +88,60 @@ class Reg:
         self.link(lambda *args: (negmask & self.value) | (mask & xform(*args)), *upstream)
 
     def set(self, value):
-        if self.maxval is not None:
-            value = min(self.maxval, value)
-        if self.minval is not None:
-            value = max(self.minval, value)
+        # Same as min and max but without the builtin call, this is hot for clamped hardware registers:
+        maxval = self.maxval
+        if maxval is not None and not value < maxval:
+            value = maxval
+        minval = self.minval
+        if minval is not None and not value > minval:
+            value = minval
         self._value = value
+        batch = self.batch
+        if batch is not None and batch.dirty is not None:
+            batch.dirty[self] = None
+            return
+        links = self.links
+        if not links:
+            return
         self.idle = False
         try:
-            for link in self.links:
+            for link in links:
                 link.update()
         finally:
             self.idle = True
 
     value = property(lambda self: self._value, lambda self, value: self.set(value))
 
+    def snapshot(self):
+        return getattr(self, '_value', self.undefined)
+
+    def restore(self, snapshot):
+        'Put back the value without clamping or propagating, as links were consistent when the snapshot was taken.'
+        if snapshot is self.undefined:
+            if hasattr(self, '_value'):
+                del self._value
+        else:
+            self._value = snapshot
+
 class VersionReg(Reg):
 
-    version = 0
+    __slots__ = 'version',
+
+    def __init__(self, *args, **kwargs):
+        self.version = 0
+        super().__init__(*args, **kwargs)
 
     def set(self, value):
         super().set(value)
         self.version += 1
 
+    def snapshot(self):
+        return super().snapshot(), self.version
+
+    def restore(self, snapshot):
+        value, self.version = snapshot
+        super().restore(value)
+
 def regproperty(reg):
     def fget(self):
         return reg(self).value
@@ -0,0 +1,108 @@
+# Copyright 2014, 2018, 2019, 2020 Andrzej Cichocki
+
+# This file is part of pym2149.
+#
+# pym2149 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pym2149 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
+
+
+'Render a directory or manifest of YM, Dosound bytecode and Lurlene files to WAV using a pool of processes.'
+from ..config import ConfigName
+from ..lurlene import issong
+from ..util import initlogging
+from diapyr import DI
+from importlib import import_module
+from multiprocessing import Pool
+from pathlib import Path
+import logging, sys, time, wave
+
+log = logging.getLogger(__name__)
+renderers = {
+    '.dsd': 'dsd2wav',
+    '.py': 'lc2wav',
+    '.ym': 'ym2wav',
+}
+childconfig = [
+    'pianorollenabled = false', # Rolls from concurrent renders would interleave.
+    'renderworkers = 1', # Pool processes are daemonic so can't have children.
+]
+
+def _renderable(path):
+    suffix = path.suffix.lower()
+    return suffix in renderers and path.is_file() and ('.py' != suffix or issong(path))
+
+def findjobs(inpath):
+    'Yield (path, relpath) for each renderable file in a directory, or for each line of a manifest, which is not filtered.'
+    if inpath.is_dir():
+        for path in sorted(inpath.rglob('*')):
+            if _renderable(path):
+                yield path, path.relative_to(inpath)
+    else:
+        for line in inpath.read_text().splitlines():
+            line = line.strip()
+            if line and not line.startswith('#'):
+                relpath = Path(line)
+                # Manifest entries are relative to the manifest, absolute ones are flattened into outdir:
+                yield inpath.parent / relpath, Path(relpath.name) if relpath.is_absolute() else relpath
+
+def _size(job):
+    try:
+        return job[1].stat().st_size
+    except OSError:
+        return 0 # The render will report it.
+
+def _initworker():
+    logging.getLogger().setLevel(logging.WARNING)
+
+def _render(job):
+    args, path, outpath = job
+    outpath.parent.mkdir(parents = True, exist_ok = True)
+    start = time.time()
+    try:
+        import_module(f".{renderers[path.suffix.lower()]}", __package__).main([*args, str(path), str(outpath)])
+        elapsed = time.time() - start
+        with wave.open(str(outpath)) as w:
+            return elapsed, w.getnframes() / w.getframerate()
+    except BaseException: # Including SystemExit from a bad config.
+        log.exception("Failed to render: %s", path)
+
+def main():
+    initlogging()
+    configname = ConfigName('inpath', 'outdir')
+    config = configname.loadconfig(DI())
+    outdir = Path(config.outdir)
+    args = [arg for text in [*configname.additems.config, *childconfig] for arg in ['--config', text]]
+    if configname.additems.ignore_settings:
+        args.append('--ignore-settings')
+    jobs = [(args, path, outdir / relpath.with_suffix('.wav')) for path, relpath in findjobs(Path(config.inpath))]
+    jobs.sort(key = _size, reverse = True) # Biggest first, so that a long render doesn't start last and keep the others waiting.
+    failures = []
+    totalaudio = 0
+    start = time.time()
+    with Pool(config.batchworkers, _initworker) as pool:
+        for (_, path, outpath), stats in zip(jobs, pool.imap(_render, jobs)):
+            if stats is None:
+                failures.append(path)
+                continue
+            elapsed, duration = stats
+            totalaudio += duration
+            log.info("Rendered %s in %.3f seconds, %.3f seconds of audio at %.1fx realtime.", outpath, elapsed, duration, duration / elapsed)
+    elapsed = time.time() - start
+    log.info("Rendered %s of %s files in %.3f seconds, %.3f seconds of audio at %.1fx realtime.", len(jobs) - len(failures), len(jobs), elapsed, totalaudio, totalaudio / elapsed if elapsed else 0)
+    for path in failures:
+        log.error("Failed: %s", path)
+    if failures:
+        sys.exit(1)
+
+if '__main__' == __name__:
+    main()
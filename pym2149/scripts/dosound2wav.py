@@ -19,6 +19,7 @@
 from . import boot, srcbytecodefactory
 from .. import out
 from ..config import ConfigName
+from ..parallel import ParallelPlayer
 from ..timerimpl import ChipTimer
 from ..util import initlogging, MainThread
 from ..ymplayer import PhysicalBundle, Player
@@ -32,7 +33,7 @@ def main():
         out.configure(di)
         di.add(ChipTimer)
         di.add(PhysicalBundle)
-        di.add(Player)
+        di.add(ParallelPlayer if config.renderworkers > 1 else Player)
         di.all(Started)
         di(MainThread).sleep()
 
@@ -21,12 +21,13 @@ from .. import out
 from ..config import ConfigName
 from ..dosound import Bytecode
 from ..iface import Config
+from ..parallel import ParallelPlayer
 from ..timerimpl import ChipTimer
 from ..util import initlogging, MainThread
 from ..ymplayer import PhysicalBundle, Player
 from diapyr import types
 from diapyr.start import Started
-import logging
+import logging, sys
 
 log = logging.getLogger(__name__)
 
@@ -36,15 +37,15 @@ def _dsdbytecodefactory(config):
         log.debug("Total ticks: %s", (ord(f.read(1)) << 8) | ord(f.read(1)))
         return Bytecode(f.read(), config.dosoundextraseconds)
 
-def main():
+def main(args = sys.argv[1:]):
     initlogging()
-    config, di = boot(ConfigName('inpath', 'outpath', name = 'dsd'))
+    config, di = boot(ConfigName('inpath', 'outpath', name = 'dsd', args = args))
     with di:
         di.add(_dsdbytecodefactory)
         out.configure(di)
         di.add(ChipTimer)
         di.add(PhysicalBundle)
-        di.add(Player)
+        di.add(ParallelPlayer if config.renderworkers > 1 else Player)
         di.all(Started)
         di(MainThread).sleep()
 
@@ -20,6 +20,7 @@ from . import boot
 from .. import out
 from ..config import ConfigName
 from ..lurlene import loadcontext, LurleneBridge
+from ..parallel import ParallelPlayer
 from ..timerimpl import ChipTimer
 from ..util import initlogging, MainThread
 from ..ymplayer import LogicalBundle, Player
@@ -35,7 +36,7 @@ def main(args = sys.argv[1:]):
         out.configure(di)
         di.add(ChipTimer)
         di.add(LogicalBundle)
-        di.add(Player)
+        di.add(ParallelPlayer if config.renderworkers > 1 else Player)
         di.all(Started)
         di(MainThread).sleep()
 
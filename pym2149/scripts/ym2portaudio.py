@@ -22,7 +22,7 @@ from ..config import ConfigName
 from ..timerimpl import SyncTimer
 from ..util import initlogging, MainThread
 from ..ymformat import YMOpen
-from ..ymplayer import PhysicalBundle, Player
+from ..ymplayer import Player, SeekableBundle
 from diapyr.start import Started
 
 def main():
@@ -32,7 +32,7 @@ def main():
         di.add(YMOpen)
         portaudioclient.configure(di)
         di.add(SyncTimer)
-        di.add(PhysicalBundle)
+        di.add(SeekableBundle)
         di.add(Player)
         di.all(Started)
         di(MainThread).sleep()
@@ -19,21 +19,29 @@
 from . import boot
 from .. import out
 from ..config import ConfigName
+from ..parallel import ParallelPlayer
 from ..timerimpl import ChipTimer
 from ..util import initlogging, MainThread
 from ..ymformat import YMOpen
-from ..ymplayer import PhysicalBundle, Player
+from ..ymplayer import LoopPlayer, PhysicalBundle
 from diapyr.start import Started
+import logging, sys
 
-def main():
+log = logging.getLogger(__name__)
+
+def main(args = sys.argv[1:]):
     initlogging()
-    config, di = boot(ConfigName('inpath', 'outpath'))
+    config, di = boot(ConfigName('inpath', 'outpath', args = args))
     with di:
         di.add(YMOpen)
         out.configure(di)
         di.add(ChipTimer)
         di.add(PhysicalBundle)
-        di.add(Player)
+        parallel = config.renderworkers > 1
+        if parallel and config.loops is None and not config.ignoreloop:
+            log.warning("Rendering serially as the tune may loop forever.") # Else the register-only pass would never end.
+            parallel = False
+        di.add(ParallelPlayer if parallel else LoopPlayer)
         di.all(Started)
         di(MainThread).sleep()
 
@@ -42,13 +42,23 @@ class Shape:
         return cls(map(level4to5, data4), introlen)
 
     def __init__(self, g, introlen = defaultintrolen):
-        self.buf = np.fromiter(g, signaldtype)
+        self.buf = g.astype(signaldtype) if isinstance(g, np.ndarray) else np.fromiter(g, signaldtype)
         self.size = self.buf.size
         self.introlen = introlen
+        tail = self.buf[introlen:]
+        # Once past the intro of such a shape the level never changes:
+        self.holdvalue = tail[0] if introlen and (tail == tail[0]).all() else None
 
     def wavelength(self):
         return self.size - self.introlen
 
+    def advanceindex(self, index, n):
+        'Return the index after n steps from the given one, wrapping like the oscillators do.'
+        index += n
+        if index >= self.size:
+            index = self.introlen + (index - self.introlen) % self.wavelength()
+        return index
+
 rawtoneshape = 1, 0
 toneshape = Shape(rawtoneshape)
 
@@ -0,0 +1,54 @@
+# Copyright 2014, 2018, 2019, 2020 Andrzej Cichocki
+
+# This file is part of pym2149.
+#
+# pym2149 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pym2149 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from .scripts.batch2wav import _render, findjobs
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+class TestBatch2Wav(TestCase):
+
+    def test_findjobs(self):
+        with TemporaryDirectory() as tempdir:
+            tempdir = Path(tempdir)
+            (tempdir / 'sub').mkdir()
+            for name in 'a.ym', 'sub/b.YM', 'c.dsd', 'e.txt', 'setup.py':
+                (tempdir / name).write_bytes(b'')
+            (tempdir / 'd.py').write_text('from lurlene import V, D, E\n')
+            (tempdir / 'sub/g.py').write_text('import os\n# from lurlene import V\n')
+            self.assertEqual([
+                (tempdir / 'a.ym', Path('a.ym')),
+                (tempdir / 'c.dsd', Path('c.dsd')),
+                (tempdir / 'd.py', Path('d.py')),
+                (tempdir / 'sub/b.YM', Path('sub/b.YM')),
+            ], list(findjobs(tempdir)))
+            manifest = tempdir / 'manifest.txt'
+            manifest.write_text('sub/b.YM\n\n# Comment.\n  a.ym  \n/elsewhere/f.ym\n')
+            self.assertEqual([
+                (tempdir / 'sub/b.YM', Path('sub/b.YM')),
+                (tempdir / 'a.ym', Path('a.ym')),
+                (Path('/elsewhere/f.ym'), Path('f.ym')),
+            ], list(findjobs(manifest)))
+
+    def test_renderfailure(self):
+        with TemporaryDirectory() as tempdir:
+            tempdir = Path(tempdir)
+            with self.assertLogs('pym2149.scripts.batch2wav') as cm:
+                self.assertIsNone(_render((['--no-such-option'], tempdir / 'a.ym', tempdir / 'a.wav')))
+            self.assertEqual(1, len(cm.output))
+            self.assertTrue(cm.output[0].startswith(f"ERROR:pym2149.scripts.batch2wav:Failed to render: {tempdir / 'a.ym'}"))
@@ -0,0 +1,36 @@
+# Copyright 2014, 2018, 2019, 2020 Andrzej Cichocki
+
+# This file is part of pym2149.
+#
+# pym2149 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pym2149 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
+
+from .buf import BufType, MasterBuf
+from unittest import TestCase
+
+class TestMasterBuf(TestCase):
+
+    def test_viewcache(self):
+        master = BufType.float()
+        master.ensureandcrop(100)
+        views = [master.ensureandcrop(n) for n in [10, 20, 10, 20, 100]]
+        self.assertIs(views[0], views[2])
+        self.assertIs(views[1], views[3])
+        self.assertEqual((2, 2), (master.hits, master.misses))
+        for n in range(MasterBuf.viewcachesize - 1):
+            master.ensureandcrop(30 + n)
+        self.assertIs(views[1], master.ensureandcrop(20)) # Most recently used survived.
+        self.assertIsNot(views[0], master.ensureandcrop(10))
+        master.ensureandcrop(200)
+        self.assertEqual(200, len(master.ensureandcrop(200)))
+        self.assertEqual(0, len(master.views))
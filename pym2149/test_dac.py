@@ -15,10 +15,15 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
-from .buf import BufType
-from .dac import Dac
-from .nod import Block, BufNode
+from .buf import BufType, Const, Lookup
+from .dac import Dac, Level, NullEffect
+from .mix import IdealMixer
+from .nod import Block, BufNode, Container, Node
+from .out import TrivialOutChannel
+from .reg import Reg
+from .shapes import level4to5
 from unittest import TestCase
+import numpy as np
 
 class Ramps(BufNode):
 
@@ -31,8 +36,64 @@ class Ramps(BufNode):
         for i in range(self.block.framecount):
             self.blockbuf.fillpart(i, i + 1, self.buftype.dtype(i))
 
+class Pattern(BufNode):
+
+    def __init__(self, values):
+        super().__init__(BufType.signal)
+        self.values = values
+
+    def callimpl(self):
+        for i in range(self.block.framecount):
+            self.blockbuf.fillpart(i, i + 1, BufType.signal.dtype(self.values[i % len(self.values)]))
+
+class Hold(Node):
+
+    def callimpl(self):
+        return Const(BufType.signal.dtype(5), self.block.framecount)
+
+class Steady(Node):
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+    def callimpl(self):
+        return Const(BufType.signal.dtype(self.value), self.block.framecount)
+
 class TestDac(TestCase):
 
     def test_works(self):
         d = Dac(Ramps(), 16, 1)
         self.assertEqual([d.leveltopeaktopeak[v] for v in range(32)], d.call(Block(32)).tolist())
+
+    def test_const(self):
+        v = Dac(Hold(), 16, 1).call(Block(10))
+        self.assertIsInstance(v, Const)
+        self.assertEqual([Dac(Ramps(), 16, 1).leveltopeaktopeak[5]] * 10, v.tolist())
+
+    def test_lookup(self):
+        signal = Pattern([1, 0, 1, 1, 0])
+        env = Pattern(range(7, 32))
+        block = Block(100)
+        signalarray = np.resize(np.array([1, 0, 1, 1, 0], BufType.signal.dtype), block.framecount)
+        envarray = np.resize(np.arange(7, 32, dtype = BufType.signal.dtype), block.framecount)
+        def dacs():
+            for levelmode, fixed in [(1, 0), (0, 0), (0, 9), (0, 15)]:
+                yield Dac(Level(Reg(value = levelmode), Reg(value = fixed), env, signal, None, Reg(value = NullEffect)), 16, 4)
+        leveltopeaktopeak = next(dacs()).leveltopeaktopeak
+        expected = [leveltopeaktopeak[signalarray * level5] for level5 in [envarray] + [level4to5(fixed) for fixed in [0, 9, 15]]]
+        actual = [d.call(block) for d in dacs()]
+        for v in actual:
+            self.assertIsInstance(v, Lookup)
+        self.assertEqual([e.tolist() for e in expected], [v.tolist() for v in actual])
+        mixed = np.full(block.framecount, BufType.float.dtype(2 ** 14.5))
+        for e in expected:
+            mixed -= e
+        self.assertEqual(mixed.tolist(), IdealMixer(Container(list(dacs())), 16, TrivialOutChannel).call(block).tolist())
+
+    def test_constsignal(self):
+        env = Pattern(range(7, 32))
+        block = Block(50)
+        for value in 0, 1:
+            v = Level(Reg(value = 1), Reg(value = 0), env, Steady(value), None, Reg(value = NullEffect)).call(block)
+            self.assertEqual([value * level5 for level5 in range(7, 32)] * 2, v.tolist())
@@ -15,7 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
-from .lfsr import Lfsr
+from .lfsr import fullperiod, Lfsr
 from .ym2149 import ym2149nzdegrees
 from unittest import TestCase
 
@@ -28,3 +28,7 @@ class TestLfsr(TestCase):
         expected = [1 - x for x in expected]
         actual = tuple(Lfsr(ym2149nzdegrees))
         self.assertTrue(''.join(map(str, expected)) in ''.join(map(str, actual)))
+
+    def test_fullperiod(self):
+        self.assertEqual(list(Lfsr(ym2149nzdegrees)), fullperiod(ym2149nzdegrees).tolist())
+        self.assertEqual(list(Lfsr([5, 3])), fullperiod([5, 3]).tolist())
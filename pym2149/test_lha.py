@@ -15,7 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
-from .lha import Stream, Tree
+from .lha import Stream, Tree, unlha
 from unittest import TestCase
 
 class TestTree(TestCase):
@@ -51,3 +51,23 @@ class TestTree(TestCase):
         self.assertEqual(100, tree.readvalue(s))
         self.assertEqual(0, s.cursor)
         self.assertEqual(8, s.remaining)
+
+class TestStream(TestCase):
+
+    def test_peek(self):
+        s = Stream(b'\xa5\x0f\xf0')
+        self.assertEqual(0b101, s.read(3))
+        self.assertEqual(0b00101000, s.peek(8))
+        self.assertEqual(0b00101000011111111, s.peek(17))
+        self.assertEqual(0b00101, s.read(5))
+        self.assertEqual(1, s.cursor)
+        self.assertEqual(8, s.remaining)
+        self.assertEqual(0b000011111111000000000000, s.read(24)) # Beyond the data reads as zeros.
+
+class TestUnlha(TestCase):
+
+    def test_unlha(self):
+        # Literals, a match that overlaps its own output, and plain matches:
+        self.assertEqual(b'abcabcabcabcabcabc, the lazy dog jumps over the lazy dog, ' + b'z' * 20, unlha(bytes.fromhex(
+            '1a002d6c68352d2b0000004e00000000000000200004782e796d0000002242b2acc47819ff46e1061a2459029b8f69e03208'
+            '026e7fb10cc9050db820b113d56d80bb4bf4e41bf000')))
@@ -0,0 +1,40 @@
+# Copyright 2014, 2018, 2019, 2020 Andrzej Cichocki
+
+# This file is part of pym2149.
+#
+# pym2149 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pym2149 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
+
+from .buf import Buf
+from .minblep import MinBleps, pastesteps
+from .shapes import floatdtype
+from unittest import TestCase
+import numpy as np
+
+class TestPasteSteps(TestCase):
+
+    def test_matchesdense(self):
+        naiverate = 250000
+        minbleps = MinBleps.create(naiverate, 44100, None)
+        rnd = np.random.default_rng(0)
+        naive = np.repeat(rnd.integers(-1000, 1000, 100).astype(floatdtype), rnd.integers(1, 50, 100))
+        for naivex in 0, 1234, naiverate - 700:
+            diff = Buf(np.empty_like(naive))
+            diff.differentiate(floatdtype(5), Buf(naive))
+            outsize = minbleps.getoutcount(naivex, naive.size) + minbleps.mixinsize
+            expected, actual = (Buf(np.full(outsize, 7, floatdtype)) for _ in range(2))
+            minbleps.paste(naivex, diff, expected)
+            frames, amps = Buf(naive).steps(floatdtype(5))
+            self.assertEqual(list(np.flatnonzero(diff.buf)), list(frames))
+            pastesteps(minbleps, naivex, frames, amps, actual)
+            self.assertEqual(expected.tolist(), actual.tolist())
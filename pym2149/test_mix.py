@@ -15,9 +15,10 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
-from .buf import BufType
-from .mix import IdealMixer, Multiplexer
-from .nod import Block, BufNode, Container
+from .buf import BufType, Const
+from .mix import BinMix, IdealMixer, Multiplexer
+from .nod import Block, BufNode, Container, Node
+from .reg import Reg
 from .out import TrivialOutChannel
 from unittest import TestCase
 import numpy as np
@@ -35,6 +36,38 @@ class Counter(BufNode):
             self.blockbuf.fillpart(frameindex, frameindex + 1, self.x)
             self.x += 1
 
+class Constant(Node):
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+    def callimpl(self):
+        return Const(self.value, self.block.framecount)
+
+class Square(BufNode):
+
+    def __init__(self):
+        super().__init__(BufType.signal)
+
+    def callimpl(self):
+        self.blockbuf.fill_same(0)
+        self.blockbuf.fillpart(0, self.block.framecount // 2, BufType.signal.dtype(1))
+
+class TestBinMix(TestCase):
+
+    def test_const(self):
+        one, zero = (Constant(BufType.signal.dtype(v)) for v in [1, 0])
+        for tone, noise, toneflag, noiseflag, expected in [
+                (Square(), Square(), 0, 0, 1),
+                (one, Square(), 1, 0, 1),
+                (one, zero, 1, 1, 0),
+                (Square(), zero, 1, 1, 0)]:
+            v = BinMix(tone, noise, Reg(value = toneflag), Reg(value = noiseflag)).call(Block(4))
+            self.assertIsInstance(v, Const)
+            self.assertEqual([expected] * 4, v.tolist())
+        self.assertEqual([1, 1, 0, 0], BinMix(one, Square(), Reg(value = 1), Reg(value = 1)).call(Block(4)).tolist())
+
 class TestIdealMixer(TestCase):
 
     def expect(self, m, values, actual):
@@ -49,6 +82,19 @@ class TestIdealMixer(TestCase):
         # Check the buffer is actually cleared first:
         self.expect(m, [20, 22, 24, 26, 28], m.call(Block(5)))
 
+    def test_const(self):
+        dtype = BufType.float.dtype
+        consts = [Constant(dtype(v)) for v in [.1, .2, .3]]
+        m = IdealMixer(Container(consts), 16, TrivialOutChannel)
+        v = m.call(Block(5))
+        self.assertIsInstance(v, Const)
+        self.assertEqual([m.datum - dtype(.1) - dtype(.2) - dtype(.3)] * 5, v.tolist())
+        c = Container([consts[0], Counter(10), consts[2]])
+        m = IdealMixer(c, 16, TrivialOutChannel)
+        v = m.call(Block(5))
+        self.assertNotIsInstance(v, Const)
+        self.assertEqual([m.datum - dtype(.1) - dtype(x) - dtype(.3) for x in range(10, 15)], v.tolist())
+
 class TestMultiplexer(TestCase):
 
     def test_works(self):
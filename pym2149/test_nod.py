@@ -15,7 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
-from .nod import Block, Node
+from .buf import BufType
+from .nod import Block, BufNode, Node
 from unittest import TestCase
 
 class MyNode(Node):
@@ -29,6 +30,16 @@ class MyNode(Node):
         self.x += 1
         return x
 
+class MyBufNode(BufNode):
+
+    def __init__(self):
+        super().__init__(BufType.signal, 2)
+        self.calls = 0
+
+    def callimpl(self):
+        self.calls += 1
+        self.blockbuf.fill_same(self.calls)
+
 class TestNode(TestCase):
 
     def test_works(self):
@@ -41,3 +52,11 @@ class TestNode(TestCase):
             self.assertEqual(21, n.call(b2))
         for _ in range(2):
             self.assertEqual(12, n.call(b1))
+
+    def test_bufnode(self):
+        n = MyBufNode()
+        b1 = Block(3)
+        for _ in range(2):
+            self.assertEqual([1] * 6, n.call(b1).tolist())
+        self.assertEqual([2] * 8, n(Block(4), True).tolist())
+        self.assertEqual(2, n.calls)
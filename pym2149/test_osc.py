@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
+from .buf import Const
 from .dac import PWMEffect
 from .lfsr import Lfsr
 from .mfp import mfpclock
@@ -46,6 +47,16 @@ class AbstractTestOsc(CmpTime):
                 o.call(Block(blocksize))
             self.cmptime(start, self.performancelimit)
 
+    def test_masked(self):
+        blocksizes = 100000, 7, 33333, 1, 0, 250000
+        for p in self.performanceperiods:
+            ref, o = (self.createperfosc(8, p) for _ in range(2))
+            for n in blocksizes:
+                ref.call(Block(n))
+                o(Block(n), True)
+            for n in blocksizes:
+                self.assertEqual(ref.call(Block(n)).tolist(), o.call(Block(n)).tolist())
+
 class TestToneOsc(AbstractTestOsc, TestCase):
 
     performanceperiods = 0x001, 0xfff
@@ -124,6 +135,20 @@ class TestToneOsc(AbstractTestOsc, TestCase):
         self.assertEqual([0,0,0,0,0], o.call(Block(5)).tolist())
         self.assertEqual([1], o.call(Block(1)).tolist())
 
+class TestNumpyToneOsc(TestToneOsc):
+
+    @staticmethod
+    def createosc(scale, periodreg):
+        return ToneOsc(scale, periodreg, numpyosc = True)
+
+    def test_matcheskernel(self):
+        for shape in YM2149.noiseshape, EnvOsc.shapes[0x0d], EnvOsc.shapes[0x0e]:
+            r = Reg(value = 2)
+            expected, actual = (NoiseOsc(4, r, shape, numpyosc = numpyosc) for numpyosc in [False, True])
+            for n in 1000, 0, 17, 5000, 16, 15:
+                self.assertEqual(expected.call(Block(n)).tolist(), actual.call(Block(n)).tolist())
+                r.value += 1
+
 class TestRToneOsc(AbstractTestOsc, TestCase): # FIXME: MFP timers do not behave like YM2149 tones.
 
     performanceperiods = 0x001, 0xfff
@@ -314,6 +339,14 @@ class TestNoiseOsc(AbstractTestOsc, TestCase):
             v2 = o.call(Block(size - n)).tolist()
             self.assertEqual(ref, v1 + v2)
 
+    def test_skipahead(self):
+        r = Reg(value = 0x03)
+        framecount = 10 ** 15 + 5
+        o, ref = (NoiseOsc(8, r, YM2149.noiseshape) for _ in range(2))
+        o.advance(framecount)
+        ref.call(Block(framecount % (3 * 16 * YM2149.noiseshape.wavelength())))
+        self.assertEqual(ref.call(Block(1000)).tolist(), o.call(Block(1000)).tolist())
+
     def test_increaseperiodonboundary(self):
         r = Reg(value = 0x01)
         o = NoiseOsc(4, r, toneshape)
@@ -453,6 +486,49 @@ class TestEnvOsc(TestCase):
         for i in range(32):
             self.assertEqual([i] * 24, v[i * 24:(i + 1) * 24])
 
+    def test_masked(self):
+        for shape in 0x08, 0x0a, 0x0d, 0x0e:
+            ref, o = (EnvOsc(8, Reg(value = 3), VersionReg(value = shape)) for _ in range(2))
+            for n in 1000, 10, 0, 5000, 7:
+                ref.call(Block(n))
+                o(Block(n), True)
+                self.assertEqual((ref.index, ref.progress, ref.stepsize), (o.index, o.progress, o.stepsize))
+            self.assertEqual(ref.call(Block(3000)).tolist(), o.call(Block(3000)).tolist())
+
+    def test_positionat(self):
+        for shape in range(0x10):
+            for framecount in 0, 1, 23, 24, 25, 24 * 32, 24 * 64 + 5, 24 * 1000 - 1:
+                o = EnvOsc(8, Reg(value = 3), VersionReg(value = shape))
+                position = o.positionat(framecount)
+                o.call(Block(framecount))
+                self.assertEqual((o.index, o.progress), position)
+
+    def test_advance(self):
+        shapereg = VersionReg(value = 0x0e)
+        ref, o = (EnvOsc(8, Reg(value = 3), shapereg) for _ in range(2))
+        for framecount in 100, 24 * 64 * 1000 + 7:
+            ref.call(Block(framecount))
+        o.advance(100 + 24 * 64 * 1000 + 7)
+        self.assertEqual(ref.call(Block(500)).tolist(), o.call(Block(500)).tolist())
+        shapereg.value = 0x0d
+        o.advance(24 * 100)
+        self.assertEqual([31] * 10, o.call(Block(10)).tolist())
+
+    def test_hold(self):
+        shapereg = VersionReg(value = 0x0d)
+        o = EnvOsc(8, Reg(value = 3), shapereg)
+        self.assertEqual(list(range(32)), o.call(Block(24 * 32)).tolist()[::24])
+        self.assertEqual([31] * 24, o.call(Block(24)).tolist())
+        position = o.positionat(24 * 133 + 5)
+        v = o.call(Block(24 * 100 + 5))
+        self.assertIsInstance(v, Const)
+        self.assertEqual([31] * (24 * 100 + 5), v.tolist())
+        self.assertEqual(position, (o.index, o.progress))
+        shapereg.value = 0x0d
+        self.assertEqual(list(range(32)), o.call(Block(24 * 32)).tolist()[::24])
+        shapereg.value = 0x0e
+        self.assertNotIsInstance(o.call(Block(24 * 100)), Const)
+
     def test_0f(self):
         for shape in range(0x04, 0x08):
             o = EnvOsc(8, Reg(value = 3), VersionReg(value = shape))
@@ -75,3 +75,23 @@ class TestWavWriter(TestCase, CmpTime):
             return
         for strictlimitornone in None, .1: # Wow!
             self.minperiodperformance(True, strictlimitornone)
+
+class TestWavBuf(TestCase):
+
+    def test_snapshot(self):
+        clock = 250000
+        tone = MinPeriodTone()
+        w = WavBuf(SimpleNamespace(implclock = clock), tone, MinBleps.create(clock, 44100, None))
+        def render(cursors):
+            bufs = []
+            for tone.cursor in cursors:
+                bufs.append(w.call(Block(1001)).buf.copy())
+            return bufs
+        render(range(0, 5005, 1001))
+        snapshot = w.snapshot()
+        expected = render(range(5005, 10010, 1001))
+        render(range(0, 3003, 1001))
+        w.restore(snapshot)
+        actual = render(range(5005, 10010, 1001))
+        for e, a in zip(expected, actual):
+            self.assertTrue(np.array_equal(e, a))
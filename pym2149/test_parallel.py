@@ -0,0 +1,57 @@
+# Copyright 2014, 2018, 2019, 2020 Andrzej Cichocki
+
+# This file is part of pym2149.
+#
+# pym2149 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pym2149 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
+
+from .parallel import ParallelPlayer
+from .testutil import randomframes, renderym, writeym6
+from .ymplayer import Player
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+class NoWarmUpPlayer(ParallelPlayer):
+
+    warmupframes = 0
+
+class TestParallelPlayer(TestCase):
+
+    def setUp(self):
+        tempdir = TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.tempdir = Path(tempdir.name)
+        self.path = self.tempdir / 'test.ym'
+        writeym6(self.path, randomframes(150), 40)
+
+    def _render(self, playerclass, renderworkers):
+        outpath = self.tempdir / f"{playerclass.__name__}{renderworkers}.wav"
+        return renderym(playerclass, self.path, outpath, 'loops = 2', 'pianorollenabled = false', f"renderworkers = {renderworkers}")
+    def test_identical(self):
+        expected = self._render(Player, 1)
+        with self.assertLogs('pym2149.parallel', 'DEBUG') as cm:
+            actual = self._render(ParallelPlayer, 3)
+        self.assertIn('DEBUG:pym2149.parallel:Rendering 370 frames in 3 segments.', cm.output)
+        self.assertFalse([line for line in cm.output if line.startswith('WARNING:')])
+        self.assertEqual(expected, actual)
+
+    def test_fallback(self):
+        expected = self._render(Player, 1)
+        with self.assertLogs('pym2149.parallel', 'WARNING') as cm:
+            actual = self._render(NoWarmUpPlayer, 3)
+        self.assertEqual([
+            'WARNING:pym2149.parallel:Segment at frame 100 did not converge, rendering it again.',
+            'WARNING:pym2149.parallel:Segment at frame 250 did not converge, rendering it again.',
+        ], cm.output)
+        self.assertEqual(expected, actual)
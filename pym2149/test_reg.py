@@ -15,8 +15,13 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
+from .power import batterypower
 from .reg import Reg, VersionReg
+from .test_osc import CmpTime
+from .ym2149 import LogicalRegisters, PhysicalRegisters
+from types import SimpleNamespace
 from unittest import TestCase
+import time
 
 class TestReg(TestCase):
 
@@ -107,3 +112,19 @@ class TestReg(TestCase):
         that.value = -1
         self.assertEqual(-1, that.value)
         self.assertEqual(1, r.value)
+
+class TestPerformance(TestCase, CmpTime):
+
+    def test_playback(self):
+        if batterypower():
+            return
+        config = SimpleNamespace(chipchannels = 3, maxtoneperiod = 0xfff, maxnoiseperiod = 0x1f, maxenvperiod = 0xffff)
+        chip = PhysicalRegisters(config, LogicalRegisters(config, SimpleNamespace(mintoneperiod = 1)))
+        frames = [[(i * 7 + f) & 0xff for i in range(14)] for f in range(256)]
+        start = time.time()
+        for _ in range(12): # About a minute of 50 Hz frames.
+            for frame in frames:
+                for r, x in zip(chip.R, frame):
+                    r.value = x
+        self.cmptime(start, .25)
+        self.assertEqual(0xfff & ((frames[-1][1] << 8) | frames[-1][0]), chip.logical.toneperiods[0].value)
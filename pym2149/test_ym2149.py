@@ -15,8 +15,15 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
-from .ym2149 import LogicalRegisters, PhysicalRegisters
+from .dac import DigiDrumEffect, PWMEffect, SinusEffect
+from .nod import Block
+from .reg import Reg
+from .shapes import makesample5shape
+from .testutil import ChipConfig
+from .ym2149 import LogicalRegisters, PhysicalRegisters, YM2149
+from types import SimpleNamespace
 from unittest import TestCase
+import numpy as np, pickle, random
 
 class TestPhysicalRegisters(TestCase):
 
@@ -83,3 +90,106 @@ class TestPhysicalRegisters(TestCase):
         self.assertEqual(0x0, lr.fixedlevels[0].value)
         pr.R[8].value = 0xff
         self.assertEqual(0xf, lr.fixedlevels[0].value)
+
+    def test_batch(self):
+        lr = LogicalRegisters(self, self)
+        pr = PhysicalRegisters(self, lr)
+        values = []
+        Reg().link(values.append, lr.toneperiods[0])
+        version = lr.envshape.version
+        with pr.batch():
+            pr.R[0].value = 0x21
+            pr.R[1].value = 0x03
+            pr.R[13].value = 0x0d
+            self.assertEqual(0x000, lr.toneperiods[0].value)
+        self.assertEqual(0x321, lr.toneperiods[0].value)
+        self.assertEqual([0x321], values)
+        self.assertEqual(0xd, lr.envshape.value)
+        self.assertEqual(version + 1, lr.envshape.version)
+        pr.R[0].value = 0x54
+        self.assertEqual([0x321, 0x354], values)
+
+    def test_nestedbatch(self):
+        lr = LogicalRegisters(self, self)
+        pr = PhysicalRegisters(self, lr)
+        with pr.batch():
+            pr.R[0].value = 0x21
+            with pr.batch():
+                pr.R[1].value = 0x03
+            self.assertEqual(0x000, lr.toneperiods[0].value)
+            pr.R[6].value = 0x1f
+        self.assertEqual(0x321, lr.toneperiods[0].value)
+        self.assertEqual(0x1f, lr.noiseperiod.value)
+
+class TestYM2149(ChipConfig, TestCase):
+
+    def _chip(self):
+        lr = LogicalRegisters(self, self)
+        return lr, PhysicalRegisters(self, lr), YM2149(self, self, SimpleNamespace(log2maxpeaktopeak = 16), lr)
+
+    def _frames(self, n):
+        r = random.Random(0)
+        return [[(i, r.randrange(256)) for i in r.sample(range(14), r.randrange(1, 14))] for _ in range(n)]
+
+    def _render(self, pr, chip, frames):
+        blocks = []
+        for frame in frames:
+            with pr.batch():
+                for i, x in frame:
+                    pr.R[i].value = x
+            for framecount in 1234, 3766:
+                blocks.append([b.buf.copy() for b in chip.call(Block(framecount))])
+        return blocks
+
+    def test_snapshot(self):
+        for numpyosc in False, True:
+            self.numpyosc = numpyosc
+            lr, pr, chip = self._chip()
+            frames = self._frames(20)
+            self._render(pr, chip, frames[:10])
+            snapshot = pr.snapshot(), lr.snapshot(), chip.snapshot()
+            expected = self._render(pr, chip, frames[10:])
+            self._render(pr, chip, frames[:5]) # Scramble the state.
+            pr.restore(snapshot[0])
+            lr.restore(snapshot[1])
+            chip.restore(snapshot[2])
+            actual = self._render(pr, chip, frames[10:])
+            self.assertEqual(len(expected), len(actual))
+            for e, a in zip(expected, actual):
+                for x, y in zip(e, a):
+                    self.assertTrue(np.array_equal(x, y))
+
+    def test_pickle(self):
+        self.numpyosc = False
+        lr, pr, chip = self._chip()
+        frames = self._frames(20)
+        for chan, effect in enumerate([DigiDrumEffect(makesample5shape(range(0, 256, 8), False, False)), PWMEffect, SinusEffect]):
+            lr.timers[chan].update(1 + chan, 0x40, effect)
+        self._render(pr, chip, frames[:10])
+        data = pickle.dumps((pr.snapshot(), lr.snapshot(), chip.snapshot()))
+        self.assertLess(len(data), 10000) # Shapes are not embedded apart from the sample.
+        expected = self._render(pr, chip, frames[10:])
+        lr, pr, chip = self._chip()
+        snapshot = pickle.loads(data)
+        pr.restore(snapshot[0])
+        lr.restore(snapshot[1])
+        chip.restore(snapshot[2])
+        actual = self._render(pr, chip, frames[10:])
+        self.assertEqual(len(expected), len(actual))
+        for e, a in zip(expected, actual):
+            for x, y in zip(e, a):
+                self.assertTrue(np.array_equal(x, y))
+
+    def test_advance(self):
+        self.numpyosc = False
+        _, pr1, chip1 = self._chip()
+        _, pr2, chip2 = self._chip()
+        for frame in self._frames(50):
+            for pr in pr1, pr2:
+                with pr.batch():
+                    for i, x in frame:
+                        pr.R[i].value = x
+            for framecount in 1234, 3766:
+                chip1.call(Block(framecount))
+                chip2.advance(Block(framecount))
+                self.assertEqual(chip1.snapshot(), chip2.snapshot())
@@ -0,0 +1,122 @@
+# Copyright 2014, 2018, 2019, 2020 Andrzej Cichocki
+
+# This file is part of pym2149.
+#
+# pym2149 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pym2149 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
+
+from .ymformat import UnpackCache, YM3, YM6, YMOpen
+from io import BytesIO
+from itertools import islice
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest import TestCase
+import os, struct
+
+class TestYM(TestCase):
+
+    frames = [
+        [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14],
+        [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14],
+        [1, 9, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 255],
+        [1, 9, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 0, 255],
+    ]
+
+    def test_changes(self):
+        frames = self.frames
+        f = BytesIO(YM3.formatid.encode() + bytes(x for column in zip(*frames) for x in column))
+        f.read(4)
+        writes = [frame.writes for frame in YM3(f, True)]
+        self.assertEqual(list(enumerate(frames[0])), writes[0])
+        self.assertEqual([(0xD, 14)], writes[1]) # Envelope shape is always written as it retriggers.
+        self.assertEqual([(1, 9)], writes[2])
+        self.assertEqual([(0xC, 0)], writes[3])
+
+    def test_loop(self):
+        frames = [[(f * 16 + r) & 0x7f for r in range(16)] for f in range(10)]
+        for interleaved in False, True:
+            data = bytes(frames[f][r] for r in range(16) for f in range(10)) if interleaved else bytes(x for frame in frames for x in frame)
+            f = BytesIO(b'LeOnArD!' + struct.pack('>IIHIHIH', 10, interleaved, 0, 2000000, 50, 7, 0) + b'\0\0\0' + data + b'End!')
+            self.assertEqual(frames + frames[7:] * 3, [frame.data for frame in islice(YM6(f, False), 19)])
+            f.seek(0)
+            ym = YM6(f, False)
+            ym.loops = 2
+            self.assertEqual(16, ym.stopindex())
+            self.assertEqual(frames + frames[7:] * 2, [frame.data for frame in ym])
+            f.seek(0)
+            self.assertEqual(frames, [frame.data for frame in YM6(f, True)])
+
+    def test_builtinlha(self):
+        with TemporaryDirectory() as tempdir:
+            path = Path(tempdir, 'test.ym')
+            path.write_bytes(bytes.fromhex( # The test_changes YM3 packed with -lh5-.
+                '1a002d6c68352d240000003c00000000000000200004782e796d0000002640718118080215bdb9c05687246f00ffbbc8929224'
+                'ca152c5cc0864d1b15560ccee000'))
+            ymopen = YMOpen(SimpleNamespace(inpath = path, ignoreloop = True, loops = None, builtin_lha = True, lhacachesize = 0))
+            ymopen.start()
+            try:
+                self.assertIs(BytesIO, type(ymopen.f))
+                self.assertEqual(self.frames, [frame.data for frame in ymopen.ym])
+            finally:
+                ymopen.stop()
+
+class TestUnpackCache(TestCase):
+
+    def test_open(self):
+        unpacked = []
+        def unpackedfactory(path):
+            unpacked.append(path.name)
+            return BytesIO(path.read_bytes() * 2)
+        with TemporaryDirectory() as tempdir:
+            tempdir = Path(tempdir)
+            cache = UnpackCache(tempdir / 'cache', 10)
+            paths = []
+            for name, data in ('a', b'aa'), ('b', b'bb'), ('c', b'ccc'), ('d', b'd' * 6):
+                paths.append(tempdir / name)
+                paths[-1].write_bytes(data)
+            a, b, c, d = paths
+            self.assertEqual(b'aaaa', cache.open(unpackedfactory, a).read())
+            self.assertEqual(b'aaaa', cache.open(unpackedfactory, a).read())
+            self.assertEqual(b'bbbb', cache.open(unpackedfactory, b).read())
+            self.assertEqual(['a', 'b'], unpacked)
+            for p in (tempdir / 'cache').iterdir():
+                t = {b'aaaa': 2, b'bbbb': 1}[p.read_bytes()] # Make b least recently used.
+                os.utime(p, ns = (t, t))
+            self.assertEqual(b'cccccc', cache.open(unpackedfactory, c).read()) # Over the cap so b is evicted.
+            self.assertEqual(b'aaaa', cache.open(unpackedfactory, a).read())
+            self.assertEqual(b'bbbb', cache.open(unpackedfactory, b).read())
+            self.assertEqual(b'd' * 12, cache.open(unpackedfactory, d).read()) # Too big to cache.
+            self.assertEqual(['a', 'b', 'c', 'b', 'd'], unpacked)
+
+    def test_unusable(self):
+        with TemporaryDirectory() as tempdir:
+            tempdir = Path(tempdir)
+            path = tempdir / 'a'
+            path.write_bytes(b'aa')
+            cache = UnpackCache(path / 'cache', 10) # Can't be a directory.
+            with self.assertLogs('pym2149.ymformat', 'WARNING') as cm:
+                for _ in range(2):
+                    self.assertEqual(b'aa', cache.open(lambda path: BytesIO(path.read_bytes()), path).read())
+            self.assertEqual(4, len(cm.output))
+
+    def test_defaultdirpath(self):
+        xdg = os.environ.get('XDG_CACHE_HOME')
+        try:
+            os.environ['XDG_CACHE_HOME'] = '/xdg'
+            self.assertEqual(Path('/xdg/pym2149/unlha'), UnpackCache.defaultdirpath())
+            del os.environ['XDG_CACHE_HOME']
+            self.assertEqual(Path.home() / '.cache' / 'pym2149' / 'unlha', UnpackCache.defaultdirpath())
+        finally:
+            if xdg is not None:
+                os.environ['XDG_CACHE_HOME'] = xdg
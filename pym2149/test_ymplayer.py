@@ -0,0 +1,163 @@
+# Copyright 2014, 2018, 2019, 2020 Andrzej Cichocki
+
+# This file is part of pym2149.
+#
+# pym2149 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pym2149 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from .testutil import ChipConfig, randomframes, renderym, writeym6
+from .timer import MinBlockRateTimer
+from .ym2149 import LogicalRegisters, PhysicalRegisters, YM2149
+from .ymformat import YMOpen
+from .ymplayer import LoopPlayer, PhysicalBundle, SeekableBundle
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest import TestCase
+import numpy as np, random
+
+class TestSeekableBundle(ChipConfig, TestCase):
+
+    def setUp(self):
+        tempdir = TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.path = Path(tempdir.name, 'test.ym')
+        writeym6(self.path, randomframes(100), 30)
+
+    def _play(self, seekframe = None):
+        'Plain PhysicalBundle if seekframe is None.'
+        ymopen = YMOpen(SimpleNamespace(inpath = self.path, ignoreloop = False, loops = None, builtin_lha = False, lhacachesize = 0))
+        ymopen.start()
+        self.addCleanup(ymopen.stop)
+        lr = LogicalRegisters(self, self)
+        pr = PhysicalRegisters(self, lr)
+        chip = YM2149(self, self, SimpleNamespace(log2maxpeaktopeak = 16), lr)
+        timer = MinBlockRateTimer(self.implclock, 120)
+        if seekframe is None:
+            bundle = PhysicalBundle(ymopen, pr)
+        else:
+            bundle = SeekableBundle(SimpleNamespace(updaterate = 48, seekframe = seekframe, seektime = None, oscpause = self.oscpause), ymopen, pr, chip, timer)
+        def frames():
+            for _ in bundle:
+                yield ymopen.ym.frameindex - 1, [[b.buf.copy() for b in chip.call(block)] for block in timer.blocksforperiod(48)]
+        return bundle, frames()
+
+    def _assertframe(self, expected, actual):
+        self.assertEqual(expected[0], actual[0])
+        self.assertEqual(len(expected[1]), len(actual[1]))
+        for e, a in zip(expected[1], actual[1]):
+            self.assertEqual(len(e), len(a))
+            for x, y in zip(e, a):
+                self.assertTrue(np.array_equal(x, y))
+
+    def test_seek(self):
+        _, frames = self._play()
+        expected = [next(frames) for _ in range(250)]
+        bundle, frames = self._play(37)
+        self._assertframe(expected[37], next(frames))
+        self.assertEqual([0], list(bundle.checkpoints)) # Only indexed as far as the target.
+        self._assertframe(expected[38], next(frames))
+        for target in 12, 99, 100, 230, 0, 249, 137, 138, 140:
+            bundle.seek(target)
+            self._assertframe(expected[target], next(frames))
+        self.assertEqual([0, 50], sorted(bundle.checkpoints)) # None from the loop.
+
+    def test_indexahead(self):
+        _, frames = self._play()
+        expected = [next(frames) for _ in range(120)]
+        bundle, frames = self._play(0)
+        for i in range(30):
+            self._assertframe(expected[i], next(frames)) # Unaffected by indexing in between.
+        self.assertEqual([0, 50], sorted(bundle.checkpoints))
+        bundle.seek(99)
+        self._assertframe(expected[99], next(frames))
+        bundle.seek(110)
+        self._assertframe(expected[110], next(frames))
+
+    def test_oscpause(self):
+        self.oscpause = True
+        with self.assertRaises(Exception):
+            self._play(0)
+
+class FullPlayer(LoopPlayer):
+
+    def _state(self, ym):
+        return object(), [] # Never the same as another pass.
+
+class TestLoopPlayer(TestCase):
+
+    framecount = 60
+    loopframe = 20
+
+    def setUp(self):
+        tempdir = TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.tempdir = Path(tempdir.name)
+        self.path = self.tempdir / 'test.ym'
+        self._write(False)
+
+    def _write(self, envloop):
+        r = random.Random(0)
+        frames = []
+        for i in range(self.framecount):
+            if i < self.loopframe:
+                frame = [r.randrange(256) for _ in range(16)]
+                frame[0x1] &= 0x0f
+                frame[0x3] &= 0x0f
+            else:
+                frame = [0] * 16
+                frame[0x0] = 250 # Whole cycles per pass, and the output phase lines up every 5 passes.
+                frame[0x7] = 0x3e
+                if envloop:
+                    frame[0x8] = 0x10
+                    frame[0xB] = 0x21
+                    frame[0xD] = 0x0e if i == self.loopframe else 255 # Written on every pass.
+                else:
+                    frame[0x8] = 8 + i % 2
+                    frame[0xD] = 255
+            frames.append(frame)
+        writeym6(self.path, frames, self.loopframe)
+
+    def _render(self, playerclass, loops = 12, pianorollenabled = False):
+        outpath = self.tempdir / f"{playerclass.__name__}.wav"
+        return renderym(playerclass, self.path, outpath, f"loops = {loops}", f"pianorollenabled = {str(pianorollenabled).lower()}")
+
+    def test_reuse(self):
+        expected = self._render(FullPlayer)
+        with self.assertLogs('pym2149.ymplayer', 'DEBUG') as cm:
+            actual = self._render(LoopPlayer)
+        self.assertIn('DEBUG:pym2149.ymplayer:State at frame 260 repeats frame 60, reusing audio for 200 frames.', cm.output)
+        self.assertEqual(expected, actual)
+
+    def test_envloop(self):
+        self._write(True)
+        expected = self._render(FullPlayer)
+        with self.assertLogs('pym2149.ymplayer', 'DEBUG') as cm:
+            actual = self._render(LoopPlayer)
+        self.assertIn('DEBUG:pym2149.ymplayer:State at frame 260 repeats frame 60, reusing audio for 200 frames.', cm.output)
+        self.assertEqual(expected, actual)
+
+    def test_nothingtoreuse(self):
+        expected = self._render(FullPlayer, 6)
+        with self.assertLogs('pym2149', 'DEBUG') as cm:
+            actual = self._render(LoopPlayer, 6) # The state repeats at frame 260, with less than a period left.
+        self.assertFalse([line for line in cm.output if 'reusing' in line])
+        self.assertEqual(expected, actual)
+
+    def test_roll(self):
+        expected = self._render(FullPlayer)
+        with self.assertLogs('pym2149.ymplayer', 'DEBUG') as cm:
+            actual = self._render(LoopPlayer, pianorollenabled = True)
+        self.assertEqual(['DEBUG:pym2149.ymplayer:Not reusing audio as the piano roll needs every frame.'], cm.output)
+        self.assertEqual(expected, actual)
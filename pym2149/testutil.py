@@ -0,0 +1,69 @@
+# Copyright 2014, 2018, 2019, 2020 Andrzej Cichocki
+
+# This file is part of pym2149.
+#
+# pym2149 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pym2149 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import out
+from .config import ConfigName
+from .scripts import boot
+from .timerimpl import ChipTimer
+from .util import MainThread
+from .ymformat import YMOpen
+from .ymplayer import PhysicalBundle
+from diapyr.start import Started
+import random, struct
+
+class ChipConfig:
+    'Mix into a TestCase to pass it as config when building a chip by hand.'
+
+    chipchannels = 3
+    maxtoneperiod = 0xfff
+    maxnoiseperiod = 0x1f
+    maxenvperiod = 0xffff
+    oscpause = False
+    numpyosc = False
+    mintoneperiod = 1
+    scale = 8
+    implclock = 250000
+
+def randomframes(framecount):
+    r = random.Random(0)
+    frames = []
+    for _ in range(framecount):
+        frame = [r.randrange(256) for _ in range(16)]
+        frame[0x1] = frame[0x1] & 0x0f | r.choice([0x00, 0x10, 0x20, 0x30, 0x90]) # Sometimes a timer effect.
+        frame[0x3] &= 0x0f
+        frames.append(frame)
+    return frames
+
+def writeym6(path, frames, loopframe):
+    path.write_bytes(b'YM6!LeOnArD!' + struct.pack('>IIHIHIH', len(frames), 0, 0, 2000000, 50, loopframe, 0)
+            + b'\0\0\0' + bytes(x for frame in frames for x in frame) + b'End!')
+
+def renderym(playerclass, inpath, outpath, *config):
+    'Render the YM to WAV as ym2wav does but with the given player, and return the bytes.'
+    args = ['--ignore-settings']
+    for c in config:
+        args += ['--config', c]
+    config, di = boot(ConfigName('inpath', 'outpath', args = [*args, str(inpath), str(outpath)]))
+    with di:
+        di.add(YMOpen)
+        out.configure(di)
+        di.add(ChipTimer)
+        di.add(PhysicalBundle)
+        di.add(playerclass)
+        di.all(Started)
+        di(MainThread).sleep()
+    return outpath.read_bytes()
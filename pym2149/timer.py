@@ -27,11 +27,21 @@ class SimpleTimer(Timer):
         self.carryticks = 0
         self.clock = clock
 
-    def blocksforperiod(self, refreshrate):
+    def wholeperiodblock(self, refreshrate):
+        'Advance only the carry by one period, and return a single block of its duration.'
         available = self.carryticks + self.clock
         blockticks = int(round(available / refreshrate))
         self.carryticks = available - blockticks * refreshrate
-        yield Block(blockticks)
+        return Block(blockticks)
+
+    def blocksforperiod(self, refreshrate):
+        yield self.wholeperiodblock(refreshrate)
+
+    def snapshot(self):
+        return self.carryticks
+
+    def restore(self, snapshot):
+        self.carryticks = snapshot
 
     def __del__(self):
         if self.carryticks:
@@ -16,14 +16,14 @@
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
 from .clock import ClockInfo
-from .dac import Dac, Level
+from .dac import Dac, Level, NullEffect
 from .iface import AmpScale, Config
-from .lfsr import Lfsr
+from .lfsr import fullperiod
 from .mfp import mfpclock, MFPTimer
 from .mix import BinMix
 from .nod import Container
 from .osc2 import EnvOsc, NoiseOsc, RToneOsc, Shape, ToneOsc
-from .reg import Reg, VersionReg
+from .reg import Batch, Reg, VersionReg
 from diapyr import types
 import logging
 
@@ -70,6 +70,19 @@ class LogicalRegisters:
         self.envshape.value = 0
         self.timers = tuple(MFPTimer() for _ in channels)
 
+    def _regs(self):
+        return [*self.toneperiods, self.noiseperiod, *self.toneflags, *self.noiseflags, *self.fixedlevels, *self.levelmodes, self.envshape, self.envperiod]
+
+    def snapshot(self):
+        return tuple(r.snapshot() for r in self._regs()), tuple(t.snapshot() for t in self.timers)
+
+    def restore(self, snapshot):
+        regs, timers = snapshot
+        for r, s in zip(self._regs(), regs):
+            r.restore(s)
+        for t, s in zip(self.timers, timers):
+            t.restore(s)
+
 class PhysicalRegisters:
 
     supportedchannels = 3
@@ -94,10 +107,23 @@ class PhysicalRegisters:
         for r in self.R:
             r.value = 0
         self.logical = logical
+        self.batchobj = Batch(self.R)
+
+    def batch(self):
+        'Context in which register writes are collected, and each logical register is updated once at the end.'
+        return self.batchobj
+
+    def snapshot(self):
+        'Values of the 16 registers, the logical registers have their own snapshot.'
+        return tuple(r.snapshot() for r in self.R)
+
+    def restore(self, snapshot):
+        for r, s in zip(self.R, snapshot):
+            r.restore(s)
 
 class YM2149(Container):
 
-    noiseshape = Shape(Lfsr(ym2149nzdegrees))
+    noiseshape = Shape(fullperiod(ym2149nzdegrees))
 
     @types(Config, ClockInfo, AmpScale, LogicalRegisters)
     def __init__(self, config, clockinfo, ampscale, logical):
@@ -105,14 +131,17 @@ class YM2149(Container):
         channels = config.chipchannels
         self.oscpause = config.oscpause
         self.clock = clockinfo.implclock
+        numpyosc = config.numpyosc
         # Chip-wide signals:
-        noise = NoiseOsc(self.scale, logical.noiseperiod, self.noiseshape)
-        env = EnvOsc(self.scale, logical.envperiod, logical.envshape)
+        noise = NoiseOsc(self.scale, logical.noiseperiod, self.noiseshape, numpyosc)
+        env = EnvOsc(self.scale, logical.envperiod, logical.envshape, numpyosc)
         # Digital channels from binary to level in [0, 31]:
-        tones = [ToneOsc(self.scale, logical.toneperiods[c]) for c in range(channels)]
+        tones = [ToneOsc(self.scale, logical.toneperiods[c], numpyosc) for c in range(channels)]
         rtones = [RToneOsc(mfpclock, self.clock, logical.timers[c], logical.fixedlevels[c]) for c in range(channels)]
         # XXX: Add rtones to maskables?
         self.maskables = tones + [noise, env] # Maskable by mixer and level mode.
+        self.rtones = rtones
+        self.oscs = [noise, env, *tones, *rtones]
         binchans = [BinMix(tones[c], noise, logical.toneflags[c], logical.noiseflags[c]) for c in range(channels)]
         levels = [Level(logical.levelmodes[c], logical.fixedlevels[c], env, binchans[c], rtones[c], logical.timers[c].effect) for c in range(channels)]
         super().__init__([Dac(level, ampscale.log2maxpeaktopeak, channels) for level in levels])
@@ -124,3 +153,19 @@ class YM2149(Container):
             for maskable in self.maskables:
                 maskable(self.block, True) # The masked flag tells the node we don't care about output.
         return result
+
+    def advance(self, block):
+        'Update oscillator state as if the block had been rendered, which is much cheaper as no levels are computed.'
+        for maskable in self.maskables:
+            maskable.advance(block.framecount)
+        for rtone in self.rtones:
+            if rtone.timer.effect.value is not NullEffect: # Otherwise Level doesn't run it.
+                rtone(block, False) # Also has to run for the repeat register.
+
+    def snapshot(self):
+        'State of every oscillator, together with register snapshots this is enough to resume rendering exactly.'
+        return tuple(osc.snapshot() for osc in self.oscs)
+
+    def restore(self, snapshot):
+        for osc, s in zip(self.oscs, snapshot):
+            osc.restore(s)
@@ -25,25 +25,26 @@ from contextlib import contextmanager
 from diapyr import types
 from diapyr.util import singleton
 from functools import partial
-from lagoon.util import onerror
+from io import BytesIO
+from lagoon.util import atomic, onerror
 from pathlib import Path
 from shutil import rmtree
 from tempfile import mkdtemp
-import logging, os, struct, sys
+import hashlib, logging, numpy as np, os, struct, sys
 
 log = logging.getLogger(__name__)
 
 class LoopInfo:
 
-    def __init__(self, frame, offset):
+    def __init__(self, frame):
         self.frame = frame
-        self.offset = offset
 
 class YMFileException(Exception): pass
 
 class YM:
 
     checkstr = b'LeOnArD!'
+    loops = None # Forever, if there is loop info.
     wordstruct = struct.Struct('>H')
     lwordstruct = struct.Struct('>I')
     lwordlestruct = struct.Struct('<I')
@@ -58,6 +59,7 @@ class YM:
             if self.checkstr != f.read(len(self.checkstr)):
                 raise YMFileException('Bad check string.')
         self.frameindex = 0
+        self.prevdata = None # Registers are in an unknown state, so first frame writes all of them.
         self.f = f
 
     def number(self, struct):
@@ -95,17 +97,41 @@ class YM:
         self.skip(1)
         return text
 
-    def interleavedframe(self):
-        frame = [None] * self.framesize
-        for i in range(self.framesize - 1):
-            frame[i] = ord(self.f.read(1))
-            self.skip(-1 + self.framecount)
-        frame[self.framesize - 1] = ord(self.f.read(1))
-        self.skip(-(self.framesize - 1) * self.framecount)
+    def loadframes(self, interleaved):
+        size = self.framecount * self.framesize
+        data = self.f.read(size)
+        if size != len(data):
+            raise YMFileException('Truncated frame data.')
+        frames = np.frombuffer(data, np.uint8)
+        if interleaved:
+            # Each register has its values for all frames together, so transpose to get frames:
+            frames = frames.reshape(self.framesize, self.framecount).T
+        self.frames = frames.reshape(self.framecount, self.framesize).tolist() # Plain ints are safest for register arithmetic.
+        self.cursor = 0
+
+    def readframe(self):
+        frame = self.frames[self.cursor]
+        self.cursor += 1
         return frame
 
-    def simpleframe(self):
-        return [c for c in self.f.read(self.framesize)]
+    def changes(self, data):
+        'Return the (index, value) register writes needed to get from the previous frame to this one.'
+        prevdata, self.prevdata = self.prevdata, data
+        if prevdata is None:
+            prevdata = [None] * len(data)
+        # Writing envelope shape retriggers the envelope even if unchanged, and 255 means don't write it:
+        return [(i, x) for i, (x, y) in enumerate(zip(data, prevdata)) if (255 != x if 0xD == i else x != y)]
+
+    @property
+    def looplen(self):
+        return self.framecount - self.loopinfo.frame
+
+    def stopindex(self):
+        'Return the number of frames that will be played, or None if the tune loops forever.'
+        if self.loopinfo is None:
+            return self.framecount
+        if self.loops is not None:
+            return self.framecount + self.loops * self.looplen
 
     def step(self):
         frame = self.frameobj(self)
@@ -113,16 +139,33 @@ class YM:
         return frame
 
     def __iter__(self):
-        while self.frameindex < self.framecount:
-            yield self.step()
-        if self.loopinfo is None:
-            return
+        # Position is re-read every time so that restore takes effect:
         while True:
-            if not (self.frameindex - self.framecount) % (self.framecount - self.loopinfo.frame):
-                log.debug("Looping to frame %s.", self.loopinfo.frame)
-                self.f.seek(self.loopinfo.offset)
+            if self.frameindex >= self.framecount:
+                if self.loopinfo is None:
+                    return
+                loopsplayed, offset = divmod(self.frameindex - self.framecount, self.looplen)
+                if not offset:
+                    if loopsplayed == self.loops:
+                        return
+                    log.debug("Looping to frame %s.", self.loopinfo.frame)
+                    self.cursor = self.loopinfo.frame # Changes stay relative to the last frame, which is what was applied.
             yield self.step()
 
+    def snapshot(self):
+        return self.frameindex, self.loopsnapshot()
+
+    def loopsnapshot(self):
+        'Like snapshot but without the number of frames played, which is all that differs between passes of the loop.'
+        return self.cursor, self.prevdata
+
+    def restore(self, snapshot):
+        self.frameindex, loopstate = snapshot
+        self.looprestore(loopstate)
+
+    def looprestore(self, loopstate):
+        self.cursor, self.prevdata = loopstate
+
     def close(self):
         self.f.close()
 
@@ -130,10 +173,11 @@ class PlainFrame:
 
     def __init__(self, ym):
         self.data = ym.readframe()
+        self.writes = ym.changes(self.data)
 
     def applydata(self, chip):
-        for i, x in enumerate(self.data):
-            if 0xD != i or 255 != x:
+        with chip.batch():
+            for i, x in self.writes:
                 chip.R[i].value = x
 
 class YM23(YM):
@@ -142,13 +186,16 @@ class YM23(YM):
     clock = stclock
     framefreq = 50
     info = ()
-    readframe = YM.interleavedframe
     loopinfo = None # Default, overridden in YM3b.
     frameobj = PlainFrame
 
     def __init__(self, f):
         super().__init__(f, False)
-        self.framecount = (os.fstat(f.fileno()).st_size - len(self.formatid)) // self.framesize
+        start = f.tell()
+        size = f.seek(0, os.SEEK_END) # Works for in-memory files too.
+        f.seek(start)
+        self.framecount = (size - len(self.formatid)) // self.framesize
+        self.loadframes(True)
 
 class YM2(YM23): # FIXME LATER: Work out format from ST-Sound source, it's not this simple.
 
@@ -173,20 +220,23 @@ class YM3b(YM23):
         if once:
             self.logignoringloopinfo()
         else:
-            self.skip(self.framecount * self.framesize)
-            loopframe = self.readloopframe()
-            self.skip(-(self.framecount * self.framesize + 4))
-            self.loopinfo = LoopInfo(loopframe, self.f.tell() + loopframe)
+            self.loopinfo = LoopInfo(self.readloopframe()) # Follows the frames.
 
 @singleton
 class EternalTTL:
 
+    def __reduce__(self):
+        return 'EternalTTL'
+
     def decr(self):
         pass
 
-    def exhausted(self):
+    def exhausted(self, timer):
         pass
 
+    def copy(self):
+        return self
+
 class FramesTTL:
 
     def __init__(self, frames):
@@ -195,20 +245,30 @@ class FramesTTL:
     def decr(self):
         self.frames -= 1
 
-    def exhausted(self):
+    def exhausted(self, timer):
         return not self.frames
 
+    def __eq__(self, that):
+        return type(self) is type(that) and self.frames == that.frames
+
+    def copy(self):
+        return type(self)(self.frames)
+
+@singleton
 class SampleTTL:
 
-    def __init__(self, repeatreg):
-        self.repeatreg = repeatreg
+    def __reduce__(self):
+        return 'SampleTTL'
 
     def decr(self):
         pass
 
-    def exhausted(self):
+    def copy(self):
+        return self
+
+    def exhausted(self, timer):
         # XXX: Somehow ensure last sample value gets a full timer period?
-        return self.repeatreg.value
+        return timer.repeat.value
 
 class YM56(YM):
 
@@ -226,24 +286,29 @@ class YM56(YM):
         log.debug("Read %s samples.", samplecount)
         self.samples = [makesample5shape(self.f.read(self.lword()), ddsigned, dd4bit) for _ in range(samplecount)]
         self.info = tuple(self.ntstring() for _ in range(3))
-        dataoffset = self.f.tell()
-        self.readframe = self.interleavedframe if interleaved else self.simpleframe
+        self.loadframes(interleaved)
         if once:
             self.logignoringloopinfo()
             self.loopinfo = None
-        elif interleaved:
-            self.loopinfo = LoopInfo(loopframe, dataoffset + loopframe)
         else:
-            self.loopinfo = LoopInfo(loopframe, dataoffset + loopframe * self.framesize)
+            self.loopinfo = LoopInfo(loopframe)
         self.timerttls = [EternalTTL] * PhysicalRegisters.supportedchannels
 
+    def loopsnapshot(self):
+        return super().loopsnapshot(), [ttl.copy() for ttl in self.timerttls]
+
+    def looprestore(self, loopstate):
+        state, timerttls = loopstate
+        super().looprestore(state)
+        self.timerttls = [ttl.copy() for ttl in timerttls] # Snapshot may be restored again.
+
     @contextmanager
     def processtimerttls(self, chip):
         for ttl in self.timerttls:
             ttl.decr()
         yield self.timerttls
         for chan, timer in enumerate(chip.timers):
-            if self.timerttls[chan].exhausted():
+            if self.timerttls[chan].exhausted(timer):
                 timer.effect.value = NullEffect
                 self.timerttls[chan] = EternalTTL
 
@@ -282,7 +347,7 @@ class Frame5(Frame56):
             if sample is not None:
                 tcr = (self.data[0x8] & 0xe0) >> 5
                 tdr = self.data[0xF]
-                yield chan, tcr, tdr, DigiDrumEffect(sample), SampleTTL(chip.timers[chan].repeat)
+                yield chan, tcr, tdr, DigiDrumEffect(sample), SampleTTL
 
 class Frame6(Frame56):
 
@@ -300,7 +365,7 @@ class Frame6(Frame56):
                     if sample is not None:
                         tcr = (self.data[rr] & 0xe0) >> 5
                         tdr = self.data[rrr]
-                        yield chan, tcr, tdr, DigiDrumEffect(sample), SampleTTL(chip.timers[chan].repeat)
+                        yield chan, tcr, tdr, DigiDrumEffect(sample), SampleTTL
                 if 0x80 == fx:
                     tcr = (self.data[rr] & 0xe0) >> 5
                     tdr = self.data[rrr]
@@ -328,11 +393,15 @@ class YMOpen(YMFile):
     @types(Config)
     def __init__(self, config):
         self.path = Path(config.inpath)
-        self.once = config.ignoreloop
-        self.unpackedfactory = partial(UnpackedFile, _builtin_lha if config.builtin_lha else _real_lha)
+        self.once = config.ignoreloop if config.loops is None else not config.loops
+        self.loops = config.loops
+        self.unpackedfactory = _builtin_lha if config.builtin_lha else partial(UnpackedFile, _real_lha)
+        if config.lhacachesize:
+            self.unpackedfactory = partial(UnpackCache(UnpackCache.defaultdirpath(), config.lhacachesize).open, self.unpackedfactory)
 
     def start(self):
         self.startimpl()
+        self.ym.loops = self.loops
         for info in self.ym.info:
             log.info(info)
         self.nominalclock = self.ym.clock
@@ -377,8 +446,56 @@ class UnpackedFile:
         self.f.close()
         self._clean()
 
-def _builtin_lha(path, dirpath):
-    (dirpath / 'unlha').write_bytes(unlha(path.read_bytes()))
+class UnpackCache:
+    '''Unpacked YM payloads keyed by hash of the packed file, least recently used are evicted to stay within maxsize bytes.
+    The cache is only an optimisation, so if it can't be read or written the payload is unpacked as normal.'''
+
+    @staticmethod
+    def defaultdirpath():
+        return Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache', 'pym2149', 'unlha')
+
+    def __init__(self, dirpath, maxsize):
+        self.dirpath = dirpath
+        self.maxsize = maxsize
+
+    def open(self, unpackedfactory, path):
+        cachepath = self.dirpath / hashlib.sha256(path.read_bytes()).hexdigest()
+        try:
+            data = cachepath.read_bytes()
+            os.utime(cachepath) # Now most recently used.
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning("Failed to read cache: %s", e)
+        else:
+            log.debug("Unpacked data from cache: %s", cachepath)
+            return BytesIO(data)
+        f = unpackedfactory(path)
+        try:
+            data = f.read()
+        finally:
+            f.close()
+        if len(data) <= self.maxsize:
+            try:
+                with atomic(cachepath) as q:
+                    q.write_bytes(data)
+                self._evict()
+            except OSError as e:
+                log.warning("Failed to write cache: %s", e)
+        return BytesIO(data)
+
+    def _evict(self):
+        entries = [(p.stat(), p) for p in self.dirpath.iterdir() if p.is_file()]
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, p in sorted(entries, key = lambda e: e[0].st_mtime_ns):
+            if total <= self.maxsize:
+                break
+            log.debug("Evicting from cache: %s", p)
+            p.unlink(missing_ok = True) # Another process may have got there first.
+            total -= stat.st_size
+
+def _builtin_lha(path):
+    return BytesIO(unlha(path.read_bytes()))
 
 def _real_lha(path, dirpath):
     from lagoon import lha
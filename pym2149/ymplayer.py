@@ -15,10 +15,21 @@
 # You should have received a copy of the GNU General Public License
 # along with pym2149.  If not, see <http://www.gnu.org/licenses/>.
 
-from .iface import Chip, Config, Prerecorded, Roll, Stream, Timer
-from .ym2149 import PhysicalRegisters
+from .buf import Buf
+from .dac import DigiDrumEffect
+from .iface import Chip, Config, Prerecorded, Roll, Stream, Timer, YMFile
+from .out import FloatStream
+from .ym2149 import PhysicalRegisters, YM2149
 from diapyr import types
 from splut.bg import MainBackground
+import logging, numpy as np
+
+log = logging.getLogger(__name__)
+
+def samewavs(wavs1, wavs2):
+    'Compare WavBuf snapshots.'
+    return all(np.array_equal(carry1, carry2) and dc1 == dc2 and naivex1 == naivex2
+            for (carry1, dc1, naivex1), (carry2, dc2, naivex2) in zip(wavs1, wavs2))
 
 class Bundle:
 
@@ -41,6 +52,98 @@ class PhysicalBundle(Bundle):
     def __init__(self, prerecorded, registers):
         super().__init__(prerecorded, registers)
 
+class SeekableBundle(PhysicalBundle):
+    '''Like PhysicalBundle but playback can jump to any frame.
+    Frames of the first pass are checkpointed every checkpointinterval as they are reached, whether played or skipped, so a seek restores the nearest checkpoint and advances from there without rendering.
+    Between played frames the rest of the first pass is indexed indexahead times as fast as playback, until a seek further than that has to advance from the furthest checkpoint.'''
+
+    checkpointinterval = 50
+    indexahead = 10
+    end = object()
+
+    @types(Config, YMFile, PhysicalRegisters, YM2149, Timer)
+    def __init__(self, config, ymfile, registers, chip, timer):
+        super().__init__(ymfile, registers)
+        if config.oscpause:
+            raise Exception('Seeking needs oscpause false, as skipped frames advance every oscillator.')
+        self.updaterate = config.updaterate
+        self.chip = chip
+        self.timer = timer
+        self.checkpoints = {}
+        self.indexcredit = 0
+        if config.seektime is None:
+            self.seek(config.seekframe)
+        else:
+            self.seektime(config.seektime)
+
+    def seek(self, frameindex):
+        'Jump to the given frame before the next one is played.'
+        self.target = max(0, frameindex)
+
+    def seektime(self, seconds):
+        self.seek(round(seconds * self.updaterate))
+
+    def __iter__(self):
+        ym = self.prerecorded.ym
+        self.frames = iter(self.prerecorded.frames(self.registers))
+        while True:
+            self._checkpoint(ym) # The chip has now rendered up to this frame.
+            target, self.target = self.target, None
+            if target is not None:
+                self._seek(ym, target)
+            if next(self.frames, self.end) is self.end:
+                break
+            yield
+            self._indexahead(ym)
+
+    def _seek(self, ym, target):
+        checkpoint = max(i for i in self.checkpoints if i <= target)
+        if not checkpoint <= ym.frameindex <= target: # Otherwise it's quicker to carry on from here.
+            self._restore(ym, self.checkpoints[checkpoint])
+        while ym.frameindex < target and self._skip():
+            self._checkpoint(ym)
+
+    def _indexahead(self, ym):
+        'Take the next checkpoint of the first pass once enough frames have been played, and put the playback state back.'
+        self.indexcredit += self.indexahead
+        if self.indexcredit < self.checkpointinterval:
+            return
+        self.indexcredit -= self.checkpointinterval
+        furthest = max(self.checkpoints)
+        i = furthest + self.checkpointinterval
+        if i >= ym.framecount:
+            return
+        playback = self._snapshot(ym)
+        self._restore(ym, self.checkpoints[furthest])
+        while ym.frameindex < i:
+            self._skip()
+        self._checkpoint(ym)
+        self._restore(ym, playback)
+
+    def _skip(self):
+        'Apply the next frame and advance the chip by its duration, return false if there are no more frames.'
+        if next(self.frames, self.end) is self.end:
+            return False
+        self.chip.advance(self.timer.wholeperiodblock(self.updaterate))
+        return True
+
+    def _checkpoint(self, ym):
+        i = ym.frameindex
+        if i < ym.framecount and not i % self.checkpointinterval and i not in self.checkpoints:
+            self.checkpoints[i] = self._snapshot(ym)
+
+    def _snapshot(self, ym):
+        return ym.snapshot(), self.registers.snapshot(), self.registers.logical.snapshot(), self.chip.snapshot(), self.timer.snapshot()
+
+    def _restore(self, ym, snapshot):
+        ymstate, physical, logical, chipstate, timerstate = snapshot
+        ym.restore(ymstate)
+        self.registers.restore(physical)
+        self.registers.logical.restore(logical)
+        self.chip.restore(chipstate)
+        self.timer.restore(timerstate)
+        self.frames = iter(self.prerecorded.frames(self.registers)) # The previous one may have finished.
+
 class Player(MainBackground):
 
     @types(Config, Bundle, Roll, Timer, Stream)
@@ -60,3 +163,123 @@ class Player(MainBackground):
             for b in self.timer.blocksforperiod(self.updaterate):
                 self.stream.call(b)
         self.stream.flush()
+
+class Recorder:
+    'Stand-in for the WAV file that keeps copies of the blocks written while recording, and passes them through to f if any.'
+
+    def __init__(self, f = None, recording = False):
+        self.f = f
+        self.recording = recording
+        self.blocks = []
+
+    def block(self, buf):
+        if self.f is not None:
+            self.f.block(buf)
+        if self.recording:
+            self.blocks.append(buf.buf.copy())
+
+    def nbytes(self, start):
+        return sum(block.nbytes for block in self.blocks[start:])
+
+    def discard(self, stop):
+        del self.blocks[:stop]
+
+class LoopPlayer(Player):
+    '''Like Player but when the state at the loop frame of a YM is the same as on an earlier pass, the audio since then is written again instead of being rendered.
+    Output is identical. Oscillators the loop never lets through the mixer are left out of the comparison, as their phase can't affect it.
+    The piano roll needs every frame, so when it's enabled this behaves exactly like Player.'''
+
+    recordlimit = 64 << 20 # Bytes of recent audio kept for reuse.
+
+    @types(Config, Bundle, Roll, Timer, Stream, YMFile, YM2149, PhysicalRegisters, FloatStream)
+    def __init__(self, config, bundle, roll, timer, stream, ymfile, chip, registers, wavs):
+        super().__init__(config, bundle, roll, timer, stream)
+        self.rollenabled = config.pianorollenabled
+        self.ymfile = ymfile
+        self.chip = chip
+        self.registers = registers
+        self.wavs = wavs
+
+    def __call__(self):
+        ym = self.ymfile.ym
+        stopindex = ym.stopindex()
+        if ym.loopinfo is None or stopindex is None:
+            return super().__call__()
+        if self.rollenabled:
+            log.debug("Not reusing audio as the piano roll needs every frame.")
+            return super().__call__()
+        self.idle = self._idleoscs(ym.frames[ym.loopinfo.frame:])
+        f = self.stream.f
+        self.stream.f = recorder = Recorder(f)
+        passes = [] # Frame index, state and block index at each recent loop point.
+        try:
+            for _ in self.bundle:
+                if self.quit:
+                    break
+                self.roll.update()
+                for b in self.timer.blocksforperiod(self.updaterate):
+                    self.stream.call(b)
+                i = ym.frameindex
+                if recorder is None or i < ym.framecount or (i - ym.framecount) % ym.looplen or i == stopindex:
+                    continue
+                recorder.recording = True # Nothing before the first loop point can be reused.
+                state, wavs = self._state(ym)
+                for j, (other, otherwavs), k in passes:
+                    if state == other and samewavs(wavs, otherwavs):
+                        period = i - j
+                        times = (stopindex - i) // period
+                        if times:
+                            log.debug("State at frame %s repeats frame %s, reusing audio for %s frames.", i, j, times * period)
+                            body = [Buf(block) for block in recorder.blocks[k:]]
+                            for _ in range(times):
+                                for block in body:
+                                    f.block(block)
+                            ym.frameindex += times * period
+                        self.stream.f = f
+                        recorder = None # Fewer than a period of frames remain.
+                        break
+                else:
+                    passes.append((i, (state, wavs), len(recorder.blocks)))
+                    while len(passes) > 1 and recorder.nbytes(passes[0][2]) > self.recordlimit:
+                        del passes[0]
+                    k = passes[0][2]
+                    recorder.discard(k)
+                    passes = [(j, other, l - k) for j, other, l in passes]
+        finally:
+            self.stream.f = f
+        self.stream.flush()
+
+    def _idleoscs(self, frames):
+        *tones, noise, env = self.chip.maskables
+        if len(tones) != self.registers.supportedchannels:
+            return set() # Can't tell which registers drive them, so compare everything.
+        mixers = {frame[0x7] for frame in frames}
+        idle = {tone for c, tone in enumerate(tones) if all(m & 1 << c for m in mixers)}
+        if all(m & 1 << c + 3 for m in mixers for c in range(len(tones))):
+            idle.add(noise)
+        if not any(frame[0x8 + c] & 0x10 for frame in frames for c in range(len(tones))):
+            idle.add(env)
+        return idle
+
+    def _state(self, ym):
+        '''Return everything that decides the audio from here given the same frames to come, and separately the WavBuf snapshots.
+        Register versions and effect instances are new on every pass, so for those only whether a write is still pending is compared.'''
+        *tones, noise, env = self.chip.maskables
+        logical = self.registers.logical
+        oscs = tuple(None if osc in self.idle else osc.snapshot() for osc in [*tones, noise])
+        if env in self.idle:
+            envstate = None
+        else:
+            shapestate, shapekey, _ = env.snapshot()
+            envstate = shapestate, shapekey, logical.envshape.version != env.shapeversion
+        timers = []
+        for timer, rtone in zip(logical.timers, self.chip.rtones):
+            effect = timer.effect.value
+            timers.append((
+                timer.control_data.snapshot(),
+                effect.sample5shape if isinstance(effect, DigiDrumEffect) else effect,
+                timer.repeat.snapshot(),
+                effect is not rtone.effect,
+                rtone.snapshot()[1:],
+            ))
+        return (ym.loopsnapshot(), self.registers.snapshot(), oscs, envstate, tuple(timers), self.timer.snapshot()), [wav.snapshot() for wav in self.wavs]